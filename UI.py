@@ -118,3 +118,37 @@ class MessageBox:
             text_surface = font.render(self.message, True, self.color)
             text_rect = text_surface.get_rect(center=self.rect.center)
             surface.blit(text_surface, text_rect)
+
+
+class LoadingScreen:
+    """Loading screen with a progress bar, redrawn as assets finish decoding"""
+    def __init__(self, screen, title="Loading..."):
+        self.screen = screen
+        self.title = title
+        self.font = pygame.font.Font(None, 48)
+        self.small_font = pygame.font.Font(None, 24)
+        self.bar_rect = pygame.Rect(SCREEN_WIDTH // 2 - 200, SCREEN_HEIGHT // 2, 400, 30)
+
+    def update(self, done, total):
+        """Draw the progress (files done / total) and keep the window responsive"""
+        pygame.event.pump()
+
+        self.screen.fill(BLACK)
+
+        title_surface = self.font.render(self.title, True, WHITE)
+        title_rect = title_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
+        self.screen.blit(title_surface, title_rect)
+
+        # Bar background, fill and border
+        pygame.draw.rect(self.screen, DARK_GRAY, self.bar_rect)
+        if total:
+            fill_rect = self.bar_rect.copy()
+            fill_rect.width = int(self.bar_rect.width * done / total)
+            pygame.draw.rect(self.screen, GREEN, fill_rect)
+        pygame.draw.rect(self.screen, WHITE, self.bar_rect, 2)
+
+        count_surface = self.small_font.render(f"{done} / {total} files", True, WHITE)
+        count_rect = count_surface.get_rect(center=(SCREEN_WIDTH // 2, self.bar_rect.bottom + 25))
+        self.screen.blit(count_surface, count_rect)
+
+        pygame.display.flip()
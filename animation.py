@@ -0,0 +1,164 @@
+"""
+Time-based sprite animation
+
+An AnimationClip is a shared, immutable sequence of frames with a duration
+per frame, built once by the AssetManager and used by every entity that
+plays it. Each entity only keeps a small Animator with the clip it plays,
+the current frame index and the time spent on that frame. Animators are
+advanced by elapsed milliseconds, so animation speed does not depend on the
+frame rate and stays stable when frames are dropped.
+
+Identical props that loop in sync (coins) can share one clock instead, by
+being added to a SyncedAnimationGroup.
+"""
+import pygame
+from config import FRAME_TIME_MS
+
+
+class AnimationClip:
+    """Shared, immutable sequence of frames with per-frame durations in milliseconds
+
+    masks optionally holds each frame's pygame.mask.Mask for pixel-perfect collision.
+    """
+    __slots__ = ('frames', 'masks', 'durations', 'loop', 'total_duration')
+
+    def __init__(self, frames, frame_duration, loop=True, masks=None):
+        frames = tuple(frames)
+        masks = tuple(masks) if masks is not None else None
+        if masks is not None and len(masks) != len(frames):
+            raise ValueError("An animation clip needs one mask per frame")
+        if isinstance(frame_duration, (int, float)):
+            durations = (frame_duration,) * len(frames)
+        else:
+            durations = tuple(frame_duration)
+        if len(durations) != len(frames):
+            raise ValueError("An animation clip needs one duration per frame")
+
+        object.__setattr__(self, 'frames', frames)
+        object.__setattr__(self, 'masks', masks)
+        object.__setattr__(self, 'durations', durations)
+        object.__setattr__(self, 'loop', loop)
+        object.__setattr__(self, 'total_duration', sum(durations))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AnimationClip is immutable")
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class Animator:
+    """Per-entity animation state: which clip is playing and where in it"""
+    __slots__ = ('clip', 'frame_index', 'elapsed')
+
+    def __init__(self, clip=None):
+        self.clip = clip
+        self.frame_index = 0
+        self.elapsed = 0
+
+    def play(self, clip, restart=True):
+        """Switch to a clip
+
+        With restart=False the current frame and timing are kept, e.g. when
+        swapping to the mirrored version of the same animation.
+        """
+        if clip is self.clip:
+            return
+        self.clip = clip
+        if restart or self.frame_index >= len(clip):
+            self.frame_index = 0
+            self.elapsed = 0
+
+    def update(self, dt):
+        """Advance the animation by dt milliseconds"""
+        clip = self.clip
+        if clip is None or clip.total_duration <= 0:
+            return
+
+        elapsed = self.elapsed + dt
+        # Skip whole loops at once after a long stall
+        if clip.loop and elapsed >= clip.total_duration:
+            elapsed %= clip.total_duration
+
+        index = self.frame_index
+        durations = clip.durations
+        while elapsed >= durations[index]:
+            if index + 1 < len(durations):
+                elapsed -= durations[index]
+                index += 1
+            elif clip.loop:
+                elapsed -= durations[index]
+                index = 0
+            else:
+                elapsed = durations[index]
+                break
+
+        self.frame_index = index
+        self.elapsed = elapsed
+
+    @property
+    def image(self):
+        """The current frame"""
+        return self.clip.frames[self.frame_index]
+
+    @property
+    def mask(self):
+        """The current frame's collision mask, or None if the clip has no masks"""
+        masks = self.clip.masks
+        return masks[self.frame_index] if masks is not None else None
+
+    @property
+    def finished(self):
+        """Whether a non-looping clip has reached its last frame"""
+        clip = self.clip
+        return (clip is not None and not clip.loop and self.frame_index == len(clip) - 1
+                and self.elapsed >= clip.durations[-1])
+
+
+class SyncedAnimationGroup(pygame.sprite.Group):
+    """Sprite group whose members play one clip on a single shared clock
+
+    Members that have a `clip` matching the group's clip are synced: the
+    group sets their `animation_group`, and they read their image from
+    frame(), optionally shifted by a fixed phase of whole frames. Updating
+    the group then costs O(1) no matter how many synced members it has.
+    Members with another clip are updated individually; members without a
+    clip are static and not updated at all.
+    """
+
+    def __init__(self, *sprites, clip=None):
+        self.animator = Animator(clip)
+        self.unsynced = set()
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        clip = getattr(sprite, 'clip', None)
+        if clip is not None and self.animator.clip is None:
+            self.animator.play(clip)
+
+        if clip is not None and clip is self.animator.clip:
+            sprite.animation_group = self
+        elif clip is not None:
+            self.unsynced.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if getattr(sprite, 'animation_group', None) is self:
+            sprite.animation_group = None
+        self.unsynced.discard(sprite)
+
+    def frame(self, phase=0):
+        """The shared current frame, shifted by phase frames"""
+        clip = self.animator.clip
+        return clip.frames[(self.animator.frame_index + phase) % len(clip)]
+
+    def update(self, dt=FRAME_TIME_MS, view=None):
+        """Advance the shared clock once, and any unsynced members individually
+
+        If view is given, unsynced members outside it are not animated.
+        """
+        self.animator.update(dt)
+        for sprite in tuple(self.unsynced):
+            if view is None or sprite.rect.colliderect(view):
+                sprite.update(dt)
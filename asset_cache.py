@@ -0,0 +1,194 @@
+"""
+Precompiled binary asset cache
+
+An offline "compile assets" step decodes every image in the manifest, slices
+sprite sheets, pre-scales frames to the sizes entities draw them at, and
+writes the raw pixels into a single file with an index. At startup the
+AssetManager memory-maps that file and builds Surfaces straight from the
+mapped pages, so warm starts skip PNG decoding and several game processes
+on one machine share the same memory. The mapping is copy-on-write: the
+surfaces are normal writable surfaces, and a page is only copied (for
+this process alone) if something draws onto it.
+
+Run it after changing assets (stale entries are ignored until you do):
+
+    python asset_cache.py
+
+File layout:
+
+    MAGIC (4 bytes) | VERSION (u32) | INDEX_SIZE (u32) | index JSON | pixel data
+
+Pixels are stored as BGRA, the byte order of display-format alpha surfaces,
+so cached surfaces blit without conversion.
+"""
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+from atlas import frame_sort_key, parse_frame_size, slice_sheet
+from config import SCREEN_WIDTH, SCREEN_HEIGHT
+from manifest import ASSET_GROUPS, RENDER_SIZES
+
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+CACHE_PATH = os.path.join(ASSETS_DIR, 'cache', 'assets.bin')
+
+MAGIC = b'PGAC'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+PIXEL_FORMAT = 'BGRA'
+
+# Asset name -> (kind, path) of its manifest entry
+MANIFEST_ENTRIES = {name: entry for assets in ASSET_GROUPS.values() for name, entry in assets.items()}
+
+
+def source_dir(kind):
+    """Directory a manifest entry's path is relative to"""
+    if kind in ('background', 'backdrop'):
+        return os.path.join(ASSETS_DIR, 'backgrounds')
+    return os.path.join(ASSETS_DIR, 'sprites')
+
+
+def source_files(kind, path):
+    """Files a manifest entry is built from"""
+    full_path = os.path.join(source_dir(kind), path)
+    if kind == 'folder':
+        if not os.path.isdir(full_path):
+            return []
+        return [os.path.join(full_path, f)
+                for f in sorted(os.listdir(full_path), key=frame_sort_key) if f.endswith('.png')]
+    return [full_path] if os.path.exists(full_path) else []
+
+
+def source_signature(filepath):
+    """Stamp used to detect a changed source file: [relative path, mtime_ns, size]"""
+    stat = os.stat(filepath)
+    return [os.path.relpath(filepath, ASSETS_DIR), stat.st_mtime_ns, stat.st_size]
+
+
+def decode_entry(kind, path):
+    """Decode a manifest entry into its list of frames, as the AssetManager would"""
+    files = source_files(kind, path)
+    if not files:
+        return []
+    if kind == 'folder':
+        return [pygame.image.load(f) for f in files]
+    if kind == 'sheet':
+        return slice_sheet(pygame.image.load(files[0]), parse_frame_size(path))
+    if kind == 'background':
+        return [pygame.transform.scale(pygame.image.load(files[0]), (SCREEN_WIDTH, SCREEN_HEIGHT))]
+    return [pygame.image.load(files[0])]
+
+
+def compile_assets(cache_path=CACHE_PATH):
+    """Decode every manifest asset and write the binary cache file"""
+    index = {}
+    chunks = []
+    offset = 0
+
+    def add_frames(frames):
+        nonlocal offset
+        entries = []
+        for frame in frames:
+            pixels = pygame.image.tobytes(frame, PIXEL_FORMAT)
+            chunks.append(pixels)
+            entries.append([offset, frame.get_width(), frame.get_height()])
+            offset += len(pixels)
+        return entries
+
+    for group, assets in ASSET_GROUPS.items():
+        for name, (kind, path) in assets.items():
+            frames = decode_entry(kind, path)
+            if not frames:
+                continue
+
+            index[name] = {
+                'sources': [source_signature(f) for f in source_files(kind, path)],
+                'frames': add_frames(frames),
+                'scaled': {
+                    f'{width}x{height}': add_frames(
+                        [pygame.transform.scale(frame, (width, height)) for frame in frames])
+                    for width, height in RENDER_SIZES.get(name, [])
+                },
+            }
+
+    index_bytes = json.dumps(index).encode('utf-8')
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for pixels in chunks:
+            f.write(pixels)
+
+    print(f"Compiled {len(index)} assets ({offset // 1024} KB of pixels) into {cache_path}")
+
+
+class AssetCache:
+    """Copy-on-write view of a compiled asset cache file (the file itself is never written)"""
+
+    def __init__(self, cache_path):
+        self.file = open(cache_path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+            magic, version, index_size = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{cache_path} is not a version {VERSION} asset cache")
+
+            index_start = HEADER.size
+            self.index = json.loads(bytes(self.map[index_start:index_start + index_size]))
+            self.data = memoryview(self.map)[index_start + index_size:]
+        except (ValueError, struct.error):
+            self.file.close()
+            raise
+
+        self.fresh = {}
+
+    @classmethod
+    def open(cls, cache_path=CACHE_PATH):
+        """Open the cache file, or return None if there is no usable cache"""
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            return cls(cache_path)
+        except (OSError, ValueError) as e:
+            print(f"Could not open asset cache: {e}")
+            return None
+
+    def is_fresh(self, name):
+        """Check whether an asset is cached and its source files (which ones, and their stamps) are unchanged"""
+        if name not in self.fresh:
+            entry = self.index.get(name)
+            try:
+                self.fresh[name] = entry is not None and name in MANIFEST_ENTRIES and \
+                    [source_signature(f) for f in source_files(*MANIFEST_ENTRIES[name])] == entry['sources']
+            except OSError:
+                self.fresh[name] = False
+        return self.fresh[name]
+
+    def build_surfaces(self, entries):
+        """Make surfaces that use their pixels straight from the mapped file (copied on write)"""
+        return [pygame.image.frombuffer(self.data[offset:offset + width * height * 4],
+                                        (width, height), PIXEL_FORMAT)
+                for offset, width, height in entries]
+
+    def frames(self, name):
+        """Get an asset's frames, or None if it is not cached or out of date"""
+        if not self.is_fresh(name):
+            return None
+        return self.build_surfaces(self.index[name]['frames'])
+
+    def scaled_frames(self, name, size):
+        """Get an asset's frames pre-scaled to size, or None if that size is not cached"""
+        if not self.is_fresh(name):
+            return None
+        entries = self.index[name]['scaled'].get(f'{size[0]}x{size[1]}')
+        if entries is None:
+            return None
+        return self.build_surfaces(entries)
+
+
+if __name__ == '__main__':
+    compile_assets()
@@ -3,187 +3,442 @@ Asset loading and management
 """
 import pygame
 import os
+import weakref
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import *
+from atlas import frame_sort_key, parse_frame_size, slice_sheet, clip_name, load_atlas, load_atlas_group, atlas_page_files
+from asset_cache import AssetCache
+from manifest import ASSET_GROUPS, CLIP_FRAME_MS, DEFAULT_BACKGROUND, DEFAULT_FRAME_MS, groups_for_level
+from animation import AnimationClip
+
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+SPRITES_DIR = os.path.join(ASSETS_DIR, 'sprites')
+BACKGROUNDS_DIR = os.path.join(ASSETS_DIR, 'backgrounds')
+
+
+def surface_bytes(surface):
+    """Approximate the pixel memory held by a top-level surface (see surfaces_bytes for subsurfaces)"""
+    return surface.get_pitch() * surface.get_height()
+
+
+def root_surface(surface):
+    """The top-level surface whose pixels a (sub)surface uses"""
+    while surface.get_parent() is not None:
+        surface = surface.get_parent()
+    return surface
+
+
+def surfaces_bytes(surfaces, counted=None):
+    """Pixel memory of some surfaces, subsurfaces charged once as their parent (counted: ids already charged)"""
+    if counted is None:
+        counted = set()
+    total = 0
+    for surface in surfaces:
+        surface = root_surface(surface)
+        if id(surface) not in counted:
+            counted.add(id(surface))
+            total += surface_bytes(surface)
+    return total
+
+
+def classify_surface(surface):
+    """Pick the cheapest blit path for a surface
+
+    Returns one of:
+        'opaque'       no transparency at all - plain copy blit
+        'colorkey'     single transparent color - RLE colorkey blit
+        'sparse-alpha' per-pixel alpha, mostly transparent - RLE alpha blit
+        'alpha'        per-pixel alpha, mostly visible - regular alpha blit
+    """
+    if surface.get_colorkey() is not None:
+        return 'colorkey'
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return 'opaque'
+
+    area = surface.get_width() * surface.get_height()
+    if pygame.mask.from_surface(surface, 254).count() == area:
+        return 'opaque'
+    if pygame.mask.from_surface(surface, 0).count() <= area // 2:
+        return 'sparse-alpha'
+    return 'alpha'
+
+
+def optimize_surface(surface, convert=True):
+    """Normalize a surface for its blit class, returning (surface, blit_class)
+
+    Fully opaque images lose their alpha channel, and sprites with a colorkey
+    or mostly transparent pixels are RLE-accelerated. Surfaces that share
+    pixels with something else (atlas subsurfaces, or convert=False for
+    memory-mapped cache pixels) are only classified, never copied or encoded.
+    """
+    blit_class = classify_surface(surface)
+    shared = surface.get_parent() is not None or not convert
+
+    if blit_class == 'opaque':
+        if not shared and surface.get_flags() & pygame.SRCALPHA:
+            surface = surface.convert()
+    elif blit_class == 'colorkey':
+        if not shared:
+            surface.set_colorkey(surface.get_colorkey(), pygame.RLEACCEL)
+    elif blit_class == 'sparse-alpha':
+        if not shared:
+            surface.set_alpha(255, pygame.RLEACCEL)
+
+    return surface, blit_class
 
 
 class AssetManager:
-    """Manages loading and caching of game assets"""
+    """Manages loading and caching of game assets
 
-    def __init__(self):
+    Assets are loaded lazily, one manifest group at a time (see manifest.py).
+    When the loaded groups exceed the memory budget, the least recently used
+    groups that the current level does not need are evicted.
+    """
+
+    def __init__(self, memory_budget=ASSET_MEMORY_BUDGET):
         self.sprites = {}
         self.backgrounds = {}
+        # Scaled/flipped animation frames, their collision masks and the
+        # clips built from them, keyed by (name, size, flip)
+        self.frame_cache = {}
+        self.mask_cache = {}
+        self.clip_cache = {}
+        # Tiled platform art keyed by (width, height)
+        self.platform_cache = {}
+        # Texture atlas metadata (see atlas.py), and clip name -> frames of the
+        # loaded groups' atlas clips (a group's pages load and unload with it)
+        self.atlas = None
+        self.atlas_frames = {}
+        # Memory-mapped precompiled pixels (see asset_cache.py)
+        self.cache = None
+
+        # Loaded groups in least-recently-used order, with their size in bytes
+        self.memory_budget = memory_budget
+        self.loaded_groups = OrderedDict()
+        self.pinned_groups = set()
+        self.asset_groups = {name: group for group, assets in ASSET_GROUPS.items() for name in assets}
+
+        # Images decoded ahead of time by preload(), keyed by file path
+        self.decoded = {}
+
+        # Blit class chosen for each asset, and optional premultiplied-alpha
+        # copies for BLEND_PREMULTIPLIED blits
+        self.blit_classes = {}
+        self.premultiplied = {}
+        self.store_premultiplied = ASSET_PREMULTIPLIED_ALPHA
+
+        # Memory accounting: surfaces made outside the manager (platform art,
+        # static layers...) tracked weakly, and which entity types use which
+        # shared frames
+        self.tracked_surfaces = weakref.WeakKeyDictionary()
+        self.frame_users = defaultdict(set)
+
         self.load_assets()
 
     def load_assets(self):
-        """Load all game assets"""
+        """Prepare asset loading (groups themselves are loaded on first request)"""
         # Check if assets directory exists
-        assets_dir = os.path.join(os.path.dirname(__file__), 'assets')
-
-        if not os.path.exists(assets_dir):
+        if not os.path.exists(ASSETS_DIR):
             print("Assets directory not found. Using colored rectangles.")
-            self.create_placeholder_assets()
-            return
-
-        # Try to load sprite images
-        self.load_sprites()
-
-        # Try to load background images
-        self.load_backgrounds()
-
-        # Create placeholders for missing assets
-        self.create_placeholder_assets()
-
-    def load_sprites(self):
-        """Load sprite images and animations"""
-        sprites_dir = os.path.join(os.path.dirname(__file__), 'assets', 'sprites')
-
-        if not os.path.exists(sprites_dir):
             return
 
-        # Try to load animation folders first
-        self.load_player_animations(sprites_dir)
-        self.load_enemy_animations(sprites_dir)
-        self.load_coin_animations(sprites_dir)
-
-        # Load single sprite files
-        sprite_files = {
-            'player': 'player.png',
-            'enemy': 'enemy.png',
-            'coin': 'coin.png',
-            'platform': 'platform.png',
-            'boss': 'boss.png'
-        }
+        # Use the precompiled binary cache if it has been built
+        self.cache = AssetCache.open()
+        if self.cache:
+            print(f"Using compiled asset cache with {len(self.cache.index)} assets")
 
-        for name, filename in sprite_files.items():
-            filepath = os.path.join(sprites_dir, filename)
-            if os.path.exists(filepath):
+        # Use the packed texture atlas if it has been built
+        if os.path.exists(SPRITES_DIR):
+            try:
+                self.atlas = load_atlas()
+                if self.atlas:
+                    print(f"Found texture atlas for {len(self.atlas)} asset groups")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not load texture atlas: {e}")
+                self.atlas = None
+
+    def preload(self, groups, progress=None, workers=ASSET_LOADER_THREADS):
+        """Decode the image files of some asset groups on a thread pool, then load the groups
+
+        Worker threads only decode PNGs; conversion to the display format
+        happens on the main thread when the groups are loaded. progress is
+        called on the main thread as progress(files_done, files_total).
+        """
+        groups = [group for group in groups if group not in self.loaded_groups]
+        paths = []
+        for group in groups:
+            for name, (kind, path) in ASSET_GROUPS[group].items():
+                paths.extend(p for p in self.asset_files(name, kind, path) if p not in paths)
+
+        total = len(paths)
+        if progress:
+            progress(0, total)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(pygame.image.load, path): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
                 try:
-                    self.sprites[name] = pygame.image.load(filepath).convert_alpha()
-                    print(f"Loaded sprite: {name}")
+                    self.decoded[futures[future]] = future.result()
                 except pygame.error as e:
-                    print(f"Could not load {filename}: {e}")
-
-    def load_player_animations(self, sprites_dir):
-        """Load player animation frames from folders"""
-        animation_folders = {
-            'player_idle': 'Captain Clown Nose without Sword/01-Idle',
-            'player_walk': 'Captain Clown Nose without Sword/02-Run',
-            'player_jump': 'Captain Clown Nose without Sword/03-Jump'
-        }
-
-        for anim_name, folder_name in animation_folders.items():
-            folder_path = os.path.join(sprites_dir, folder_name)
-            if os.path.exists(folder_path):
-                frames = []
-                # Load all PNG files in the folder, sorted
-                files = sorted([f for f in os.listdir(folder_path) if f.endswith('.png')])
-                for filename in files:
-                    filepath = os.path.join(folder_path, filename)
-                    try:
-                        frame = pygame.image.load(filepath).convert_alpha()
-                        frames.append(frame)
-                    except pygame.error as e:
-                        print(f"Could not load {filename}: {e}")
-
-                if frames:
-                    self.sprites[anim_name] = frames
-                    print(f"Loaded {len(frames)} frames for {anim_name}")
-
-    def load_enemy_animations(self, sprites_dir):
-        """Load enemy animation frames from folders"""
-        enemy_folders = {
-            'enemy_green': 'SlimeGreen',
-            'enemy_orange': 'SlimeOrange',
-            'enemy_cucumber_idle': '3-Enemy-Cucumber/1-Idle',
-            'enemy_cucumber_run': '3-Enemy-Cucumber/2-Run'
-        }
-
-        for anim_name, folder_name in enemy_folders.items():
-            folder_path = os.path.join(sprites_dir, folder_name)
-            if os.path.exists(folder_path):
-                frames = []
-                # Load all PNG files in the folder, sorted by number
-                files = sorted([f for f in os.listdir(folder_path) if f.endswith('.png')],
-                             key=lambda x: int(x.split('.')[0]) if x.split('.')[0].isdigit() else 0)
-                for filename in files:
-                    filepath = os.path.join(folder_path, filename)
-                    try:
-                        frame = pygame.image.load(filepath).convert_alpha()
-                        frames.append(frame)
-                    except pygame.error as e:
-                        print(f"Could not load {filename}: {e}")
-
-                if frames:
-                    self.sprites[anim_name] = frames
-                    print(f"Loaded {len(frames)} frames for {anim_name}")
-
-    def load_coin_animations(self, sprites_dir):
-        """Load coin animation frames from sprite sheet"""
-        diamond_path = os.path.join(sprites_dir, 'big diamond idles', 'Big Diamond Idle (18x14).png')
-
-        if os.path.exists(diamond_path):
-            try:
-                sprite_sheet = pygame.image.load(diamond_path).convert_alpha()
-
-                # The sprite sheet has frames of 18x14 pixels arranged horizontally
-                frame_width = 18
-                frame_height = 14
-                sheet_width = sprite_sheet.get_width()
-                num_frames = sheet_width // frame_width
-
-                frames = []
-                for i in range(num_frames):
-                    # Extract each frame from the sprite sheet
-                    frame = pygame.Surface((frame_width, frame_height), pygame.SRCALPHA)
-                    frame.blit(sprite_sheet, (0, 0), (i * frame_width, 0, frame_width, frame_height))
-                    frames.append(frame)
-
-                if frames:
-                    self.sprites['coin_diamond'] = frames
-                    print(f"Loaded {len(frames)} frames for diamond coin animation")
-            except pygame.error as e:
-                print(f"Could not load diamond sprite sheet: {e}")
-
-    def load_backgrounds(self):
-        """Load background images"""
-        bg_dir = os.path.join(os.path.dirname(__file__), 'assets', 'backgrounds')
-
-        if not os.path.exists(bg_dir):
+                    print(f"Could not load {futures[future]}: {e}")
+                if progress:
+                    progress(done, total)
+
+        for group in groups:
+            self.require_group(group)
+        # Drop anything decoded but not claimed by a loader (e.g. evicted groups)
+        self.decoded.clear()
+
+    def atlas_clip(self, name, kind, path):
+        """The atlas clip a manifest entry loads from, or None if it is not packed (or comes from the cache)"""
+        if not self.atlas or kind not in ('folder', 'sheet') or (self.cache and self.cache.is_fresh(name)):
+            return None
+        clip = clip_name(kind, path)
+        if clip in self.atlas.get(self.asset_groups.get(name), {}).get('clips', {}):
+            return clip
+        return None
+
+    def asset_files(self, name, kind, path):
+        """Image files a manifest entry would read from disk (its group's atlas pages if it is packed)"""
+        if self.cache and self.cache.is_fresh(name):
+            return []
+        if self.atlas_clip(name, kind, path):
+            return atlas_page_files(self.atlas, self.asset_groups[name])
+        if kind == 'folder':
+            folder_path = os.path.join(SPRITES_DIR, path)
+            if not os.path.isdir(folder_path):
+                return []
+            return [os.path.join(folder_path, f)
+                    for f in sorted(os.listdir(folder_path), key=frame_sort_key) if f.endswith('.png')]
+
+        base_dir = BACKGROUNDS_DIR if kind in ('background', 'backdrop') else SPRITES_DIR
+        filepath = os.path.join(base_dir, path)
+        return [filepath] if os.path.exists(filepath) else []
+
+    def load_image(self, filepath):
+        """Decode an image file, reusing the result of preload() if there is one"""
+        image = self.decoded.pop(filepath, None)
+        if image is None:
+            image = pygame.image.load(filepath)
+        return image
+
+    def decode_level_assets(self, level_number):
+        """Decode the image files of a level's asset groups that aren't loaded yet
+
+        Safe to call from a worker thread: it only decodes PNGs for
+        load_image() to pick up, the groups are still loaded on the main
+        thread by load_level_assets().
+        """
+        for group in groups_for_level(level_number):
+            if group in self.loaded_groups:
+                continue
+            for name, (kind, path) in ASSET_GROUPS[group].items():
+                for filepath in self.asset_files(name, kind, path):
+                    if filepath not in self.decoded:
+                        try:
+                            self.decoded[filepath] = pygame.image.load(filepath)
+                        except pygame.error as e:
+                            print(f"Could not load {filepath}: {e}")
+
+    def load_level_assets(self, level_number):
+        """Load the asset groups a level needs and keep them from being evicted"""
+        self.pinned_groups = set(groups_for_level(level_number))
+        for group in self.pinned_groups:
+            self.require_group(group)
+
+    def require_group(self, group):
+        """Make sure an asset group is loaded and mark it as recently used"""
+        if group in self.loaded_groups:
+            self.loaded_groups.move_to_end(group)
             return
 
-        # Try to load demo.png as the main background
-        demo_bg_path = os.path.join(bg_dir, 'demo.png')
-        if os.path.exists(demo_bg_path):
+        # The group's atlas pages, unless the compiled cache serves all its clips
+        if any(self.atlas_clip(name, kind, path) for name, (kind, path) in ASSET_GROUPS[group].items()):
+            try:
+                self.atlas_frames.update(load_atlas_group(self.atlas, group, self.load_image))
+            except (pygame.error, OSError, ValueError, KeyError) as e:
+                print(f"Could not load texture atlas for {group}: {e}")
+
+        # Charged like memory_report() counts: each sheet, image or atlas page once
+        size = 0
+        counted = set()
+        for name, (kind, path) in ASSET_GROUPS[group].items():
+            asset = self.load_asset(name, kind, path)
+            if asset is not None:
+                frames = asset if isinstance(asset, list) else [asset]
+                size += surfaces_bytes(frames, counted)
+
+        self.loaded_groups[group] = size
+        self.evict(keep=group)
+
+    def load_asset(self, name, kind, path):
+        """Load one manifest entry into sprites/backgrounds"""
+        assets = self.backgrounds if kind in ('background', 'backdrop') else self.sprites
+
+        cached = self.cache.frames(name) if self.cache else None
+        if cached:
+            # Keep mapped pixels shared: they are already in display format
+            assets[name] = cached if kind in ('folder', 'sheet') else cached[0]
+            return self.optimize_asset(assets, name, convert=False)
+
+        if kind == 'folder':
+            self.load_animation_folder(SPRITES_DIR, name, path)
+        elif kind == 'sheet':
+            self.load_sprite_sheet(SPRITES_DIR, name, path)
+        elif kind == 'image':
+            self.load_sprite_file(SPRITES_DIR, name, path)
+        elif kind in ('background', 'backdrop'):
+            self.load_background(name, path, scale=(kind == 'background'))
+        else:
+            raise ValueError(f"Unknown asset kind '{kind}' for {name}")
+
+        if name not in assets:
+            return None
+        return self.optimize_asset(assets, name)
+
+    def optimize_asset(self, assets, name, convert=True):
+        """Run the surface format optimizer over a loaded asset and log its blit class"""
+        asset = assets[name]
+        frames = asset if isinstance(asset, list) else [asset]
+
+        results = [optimize_surface(frame, convert) for frame in frames]
+        optimized = [surface for surface, _ in results]
+        classes = [blit_class for _, blit_class in results]
+        assets[name] = optimized if isinstance(asset, list) else optimized[0]
+
+        self.blit_classes[name] = max(set(classes), key=classes.count)
+        if self.store_premultiplied and any(c in ('alpha', 'sparse-alpha') for c in classes):
+            premultiplied = [surface.premul_alpha() for surface in optimized]
+            self.premultiplied[name] = premultiplied if isinstance(asset, list) else premultiplied[0]
+
+        summary = ', '.join(f"{c} x{classes.count(c)}" for c in sorted(set(classes)))
+        print(f"Blit class for {name}: {summary}")
+        return assets[name]
+
+    def evict(self, keep=None):
+        """Unload least recently used groups until the memory budget is met"""
+        for group in list(self.loaded_groups):
+            if self.memory_used() <= self.memory_budget:
+                break
+            if group == keep or group in self.pinned_groups:
+                continue
+            self.unload_group(group)
+
+    def unload_group(self, group):
+        """Drop a group's assets and the frames derived from them"""
+        names = ASSET_GROUPS[group]
+        if 'platform' in names:
+            self.platform_cache.clear()
+        for name in names:
+            self.sprites.pop(name, None)
+            self.backgrounds.pop(name, None)
+            self.premultiplied.pop(name, None)
+        if self.atlas and group in self.atlas:
+            for clip in self.atlas[group]['clips']:
+                self.atlas_frames.pop(clip, None)
+        for key in [key for key in self.frame_cache if key[0] in names]:
+            del self.frame_cache[key]
+            self.mask_cache.pop(key, None)
+            self.clip_cache.pop(key, None)
+            self.frame_users.pop(key, None)
+        del self.loaded_groups[group]
+        print(f"Evicted asset group: {group}")
+
+    def memory_used(self):
+        """Bytes held by the loaded groups"""
+        return sum(self.loaded_groups.values())
+
+    def load_animation_folder(self, sprites_dir, anim_name, folder_name):
+        """Load the frames of one animation, from the atlas or from a folder of PNGs"""
+        if folder_name in self.atlas_frames:
+            self.sprites[anim_name] = self.atlas_frames[folder_name]
+            return self.sprites[anim_name]
+
+        folder_path = os.path.join(sprites_dir, folder_name)
+        if not os.path.exists(folder_path):
+            return None
+
+        frames = []
+        # Load all PNG files in the folder, sorted by number
+        files = sorted([f for f in os.listdir(folder_path) if f.endswith('.png')], key=frame_sort_key)
+        for filename in files:
+            filepath = os.path.join(folder_path, filename)
             try:
-                bg = pygame.image.load(demo_bg_path).convert_alpha()
-                # DON'T scale - use original size for zoom effect
-                # The game will crop/scroll through this larger image
-                # Use this background for all levels
-                self.backgrounds['level1'] = bg
-                self.backgrounds['level2'] = bg
-                self.backgrounds['level3'] = bg
-                print(f"Loaded demo.png background (original size: {bg.get_width()}x{bg.get_height()})")
+                frame = self.load_image(filepath).convert_alpha()
+                frames.append(frame)
             except pygame.error as e:
-                print(f"Could not load demo.png: {e}")
-
-        # Try to load individual level backgrounds
-        bg_files = {
-            'level1': 'level1.png',
-            'level2': 'level2.png',
-            'level3': 'level3.png'
-        }
-
-        for name, filename in bg_files.items():
-            filepath = os.path.join(bg_dir, filename)
-            if os.path.exists(filepath):
-                try:
-                    bg = pygame.image.load(filepath).convert()
-                    # Scale to screen size
-                    bg = pygame.transform.scale(bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
-                    self.backgrounds[name] = bg
-                    print(f"Loaded background: {name}")
-                except pygame.error as e:
-                    print(f"Could not load {filename}: {e}")
+                print(f"Could not load {filename}: {e}")
+
+        if frames:
+            self.sprites[anim_name] = frames
+            print(f"Loaded {len(frames)} frames for {anim_name}")
+            return frames
+        return None
+
+    def load_sprite_sheet(self, sprites_dir, anim_name, sheet_name):
+        """Load the frames of a horizontal sprite sheet, from the atlas or by slicing the sheet
+
+        The frame size comes from the filename, e.g. "Idle (18x14).png".
+        """
+        clip = sheet_name[:-len('.png')]
+        if clip in self.atlas_frames:
+            self.sprites[anim_name] = self.atlas_frames[clip]
+            return self.sprites[anim_name]
+
+        sheet_path = os.path.join(sprites_dir, sheet_name)
+        frame_size = parse_frame_size(sheet_name)
+        if not os.path.exists(sheet_path) or not frame_size:
+            return None
+
+        try:
+            sprite_sheet = self.load_image(sheet_path).convert_alpha()
+            frames = slice_sheet(sprite_sheet, frame_size)
+            if frames:
+                self.sprites[anim_name] = frames
+                print(f"Loaded {len(frames)} frames for {anim_name} sprite sheet")
+                return frames
+        except pygame.error as e:
+            print(f"Could not load {sheet_name}: {e}")
+        return None
+
+    def load_sprite_file(self, sprites_dir, name, filename):
+        """Load a single sprite image"""
+        filepath = os.path.join(sprites_dir, filename)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            self.sprites[name] = self.load_image(filepath).convert_alpha()
+            print(f"Loaded sprite: {name}")
+            return self.sprites[name]
+        except pygame.error as e:
+            print(f"Could not load {filename}: {e}")
+        return None
+
+    def load_background(self, name, filename, scale=True):
+        """Load a background image
+
+        Level backgrounds are scaled to the screen. Backdrops such as demo.png
+        keep their original size - the game crops/scrolls through them.
+        """
+        filepath = os.path.join(BACKGROUNDS_DIR, filename)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            if scale:
+                bg = self.load_image(filepath).convert()
+                bg = pygame.transform.scale(bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
+            else:
+                bg = self.load_image(filepath).convert_alpha()
+            self.backgrounds[name] = bg
+            print(f"Loaded background: {filename} ({bg.get_width()}x{bg.get_height()})")
+            return bg
+        except pygame.error as e:
+            print(f"Could not load {filename}: {e}")
+        return None
 
     def create_tiled_background(self, tile_image, width, height):
         """Create a tiled background surface from a tile image (like Godot)"""
@@ -198,58 +453,193 @@ class AssetManager:
 
         return surface
 
-    def create_placeholder_assets(self):
-        """Create colored rectangles as placeholders for missing assets"""
-        # Player placeholder
-        if 'player' not in self.sprites:
-            surf = pygame.Surface((PLAYER_WIDTH, PLAYER_HEIGHT))
-            surf.fill(BLUE)
-            self.sprites['player'] = surf
-
-        # Enemy placeholder
-        if 'enemy' not in self.sprites:
-            surf = pygame.Surface((ENEMY_WIDTH, ENEMY_HEIGHT))
-            surf.fill(RED)
-            self.sprites['enemy'] = surf
-
-        # Coin placeholder
-        if 'coin' not in self.sprites:
-            surf = pygame.Surface((20, 20))
-            surf.fill(YELLOW)
-            self.sprites['coin'] = surf
-
-        # Platform placeholder
-        if 'platform' not in self.sprites:
-            surf = pygame.Surface((100, PLATFORM_HEIGHT))
-            surf.fill(GRAY)
-            self.sprites['platform'] = surf
-
-        # Boss placeholder
-        if 'boss' not in self.sprites:
-            surf = pygame.Surface((BOSS_WIDTH, BOSS_HEIGHT))
-            surf.fill((128, 0, 128))  # Purple
-            self.sprites['boss'] = surf
-
-        # Background placeholders
-        for level in ['level1', 'level2', 'level3']:
-            if level not in self.backgrounds:
-                surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                # Different colors for different levels
-                if level == 'level1':
-                    surf.fill((135, 206, 235))  # Sky blue
-                elif level == 'level2':
-                    surf.fill((100, 149, 237))  # Cornflower blue
-                else:
-                    surf.fill((70, 70, 100))    # Dark blue-gray
-                self.backgrounds[level] = surf
+    def create_placeholder_sprite(self, name):
+        """Create a colored rectangle as placeholder for a missing sprite"""
+        placeholders = {
+            'player': ((PLAYER_WIDTH, PLAYER_HEIGHT), BLUE),
+            'enemy': ((ENEMY_WIDTH, ENEMY_HEIGHT), RED),
+            'coin': ((20, 20), YELLOW),
+            'platform': ((100, PLATFORM_HEIGHT), GRAY),
+            'boss': ((BOSS_WIDTH, BOSS_HEIGHT), (128, 0, 128)),  # Purple
+        }
+        if name not in placeholders:
+            return None
+
+        size, color = placeholders[name]
+        surf = pygame.Surface(size).convert()
+        surf.fill(color)
+        self.sprites[name] = surf
+        return surf
+
+    def create_placeholder_background(self, level_name):
+        """Create a solid colored placeholder for a missing level background"""
+        surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        # Different colors for different levels
+        if level_name == 'level1':
+            surf.fill((135, 206, 235))  # Sky blue
+        elif level_name == 'level2':
+            surf.fill((100, 149, 237))  # Cornflower blue
+        else:
+            surf.fill((70, 70, 100))    # Dark blue-gray
+        self.backgrounds[level_name] = surf
+        return surf
 
     def get_sprite(self, name):
-        """Get a sprite by name"""
-        return self.sprites.get(name)
+        """Get a sprite by name, loading its asset group if needed"""
+        group = self.asset_groups.get(name)
+        if group:
+            self.require_group(group)
+
+        sprite = self.sprites.get(name)
+        if sprite is None:
+            sprite = self.create_placeholder_sprite(name)
+        return sprite
+
+    def get_frames(self, name, size, flip=False, owner=None):
+        """Get the frames of a sprite scaled to size and optionally flipped horizontally
+
+        Frames are built once per (name, size, flip) and shared by every entity,
+        so animating a sprite only swaps a frame index. Single images are
+        returned as a one-frame list. owner is the requesting entity type,
+        recorded for memory_report().
+        """
+        key = (name, tuple(size), flip)
+        if owner:
+            self.frame_users[key].add(owner)
+        frames = self.frame_cache.get(key)
+        if frames is None:
+            source = self.get_sprite(name)
+            if not source:
+                return None
+            if not isinstance(source, list):
+                source = [source]
+
+            # Pre-scaled frames from the compiled cache cost no allocation
+            frames = self.cache.scaled_frames(name, size) if self.cache else None
+            mapped = frames is not None
+            if frames is None:
+                frames = [pygame.transform.scale(frame, size) for frame in source]
+            if flip:
+                frames = [pygame.transform.flip(frame, True, False) for frame in frames]
+                mapped = False
+            # Scaling and flipping drop RLE acceleration, so re-apply the blit
+            # path; frames still on the mapped cache pixels are only classified
+            frames = [optimize_surface(frame, convert=not mapped)[0] for frame in frames]
+            self.frame_cache[key] = frames
+            # Pixel-perfect collision masks, built once alongside the frames
+            self.mask_cache[key] = [pygame.mask.from_surface(frame) for frame in frames]
+
+            # Derived frames count towards the group they were made from
+            group = self.asset_groups.get(name)
+            if group in self.loaded_groups:
+                self.loaded_groups[group] += surfaces_bytes(frames)
+        return frames
+
+    def get_masks(self, name, size, flip=False):
+        """Get the collision masks of get_frames(name, size, flip), one per frame"""
+        if self.get_frames(name, size, flip) is None:
+            return None
+        return self.mask_cache[(name, tuple(size), flip)]
+
+    def get_premultiplied(self, name):
+        """Get the premultiplied-alpha copy of a sprite, for BLEND_PREMULTIPLIED blits
+
+        Only available when ASSET_PREMULTIPLIED_ALPHA is enabled and the sprite
+        has per-pixel alpha; returns None otherwise.
+        """
+        self.get_sprite(name)
+        return self.premultiplied.get(name)
+
+    def get_clip(self, name, size, flip=False, owner=None):
+        """Get a shared AnimationClip of a sprite's frames scaled to size
+
+        Frame durations come from CLIP_FRAME_MS in the manifest, and the clip
+        carries each frame's collision mask. Returns None if the sprite does
+        not exist.
+        """
+        frames = self.get_frames(name, size, flip, owner)
+        if frames is None:
+            return None
+
+        key = (name, tuple(size), flip)
+        clip = self.clip_cache.get(key)
+        if clip is None:
+            clip = AnimationClip(frames, CLIP_FRAME_MS.get(name, DEFAULT_FRAME_MS), masks=self.mask_cache[key])
+            self.clip_cache[key] = clip
+        return clip
+
+    def get_platform_surface(self, width, height=PLATFORM_HEIGHT):
+        """Get the platform sprite tiled across width x height, shared by equal-sized platforms"""
+        key = (width, height)
+        surface = self.platform_cache.get(key)
+        if surface is None:
+            sprite = self.get_sprite('platform')
+            # Tile the platform sprite to match the width
+            surface = pygame.Surface((width, height)).convert()
+            for i in range(0, width, sprite.get_width()):
+                tile = pygame.transform.scale(sprite, (min(sprite.get_width(), width - i), height))
+                surface.blit(tile, (i, 0))
+            self.platform_cache[key] = surface
+            self.track_surface(surface, 'platform_art', 'Platform')
+        return surface
+
+    def track_surface(self, surface, category, owner):
+        """Record a surface made from the assets outside the manager, for memory_report()
+
+        category groups derived surfaces (e.g. 'platform_art'), owner is the
+        entity type that made it. Surfaces are tracked weakly.
+        """
+        self.tracked_surfaces[surface] = (category, owner)
+        return surface
+
+    def memory_report(self):
+        """Bytes of pixel data per asset, derived-surface category and entity type, plus the total"""
+        # Each block of pixels counts once, as for the budget (mapped cache pixels count in full)
+        counted = set()
+
+        def size_of(surfaces):
+            return surfaces_bytes(surfaces, counted)
+
+        def frames_of(asset):
+            return asset if isinstance(asset, list) else [asset]
+
+        derived = defaultdict(int)
+        assets = {}
+        for name, asset in list(self.sprites.items()) + list(self.backgrounds.items()):
+            assets[name] = size_of(frames_of(asset))
+
+        derived['scaled_frames'] = size_of(frame for frames in self.frame_cache.values() for frame in frames)
+        # Masks hold one bit per pixel
+        derived['collision_masks'] = sum(mask.get_size()[0] * mask.get_size()[1] // 8
+                                         for masks in self.mask_cache.values() for mask in masks)
+        derived['premultiplied'] = size_of(s for asset in self.premultiplied.values() for s in frames_of(asset))
+
+        entities = defaultdict(lambda: {'own': 0, 'shared': 0})
+        for surface, (category, owner) in list(self.tracked_surfaces.items()):
+            size = size_of([surface])
+            derived[category] += size
+            entities[owner]['own'] += size
+        for key, owners in self.frame_users.items():
+            shared = surfaces_bytes(self.frame_cache.get(key, []))
+            for owner in owners:
+                entities[owner]['shared'] += shared
+
+        return {
+            'assets': assets,
+            'derived': dict(derived),
+            'entities': dict(entities),
+            'total': sum(assets.values()) + sum(derived.values()),
+        }
 
     def get_background(self, level_name):
-        """Get a background by level name"""
-        return self.backgrounds.get(level_name)
+        """Get a background by level name, falling back to the shared backdrop"""
+        for name in (level_name, DEFAULT_BACKGROUND):
+            group = self.asset_groups.get(name)
+            if group:
+                self.require_group(group)
+            if name in self.backgrounds:
+                return self.backgrounds[name]
+        return self.create_placeholder_background(level_name)
 
 
 # Global asset manager instance
@@ -0,0 +1,223 @@
+"""
+Texture atlas builder for sprite animations
+
+Packs the animation folders and sprite sheets of each manifest group into
+a few large atlas pages of their own, plus one JSON metadata file. When the
+AssetManager loads a group it loads that group's pages and hands out
+subsurfaces, instead of opening hundreds of small PNG files; the pages are
+charged to the group and freed with it when it is evicted.
+
+Run it after adding or changing sprites:
+
+    python atlas.py
+"""
+import json
+import os
+import re
+
+import pygame
+
+from manifest import ASSET_GROUPS
+
+
+SPRITES_DIR = os.path.join(os.path.dirname(__file__), 'assets', 'sprites')
+ATLAS_DIR = os.path.join(os.path.dirname(__file__), 'assets', 'atlas')
+ATLAS_METADATA = 'atlas.json'
+ATLAS_PAGE_SIZE = 1024
+ATLAS_PADDING = 1
+
+# Sprite sheets carry their frame size in the filename, e.g. "Idle (18x14).png"
+SHEET_FRAME_SIZE = re.compile(r'\((\d+)x(\d+)\)')
+
+
+def frame_sort_key(filename):
+    """Sort frame files by the number in their name ("2.png" before "10.png")"""
+    digits = ''.join(c for c in os.path.splitext(filename)[0] if c.isdigit())
+    return (int(digits) if digits else 0, filename)
+
+
+def parse_frame_size(filename):
+    """Get the (width, height) of a sprite sheet frame from its filename, or None"""
+    match = SHEET_FRAME_SIZE.search(filename)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    return None
+
+
+def clip_name(kind, path):
+    """Atlas clip name of a manifest folder or sheet: its path, without ".png" for a sheet"""
+    return path[:-len('.png')] if kind == 'sheet' else path
+
+
+def clip_files(kind, path, sprites_dir=SPRITES_DIR):
+    """Image files a manifest folder or sheet entry is made from (none if it can't be packed)"""
+    full_path = os.path.join(sprites_dir, path)
+    if kind == 'folder' and os.path.isdir(full_path):
+        return [os.path.join(full_path, f)
+                for f in sorted((f for f in os.listdir(full_path) if f.endswith('.png')), key=frame_sort_key)]
+    if kind == 'sheet' and os.path.exists(full_path) and parse_frame_size(path):
+        return [full_path]
+    return []
+
+
+def source_stamps(files, sprites_dir=SPRITES_DIR):
+    """[relative path, mtime_ns, size] of each file, to tell when a clip's sources changed"""
+    stamps = []
+    for filepath in files:
+        stat = os.stat(filepath)
+        stamps.append([os.path.relpath(filepath, sprites_dir), stat.st_mtime_ns, stat.st_size])
+    return stamps
+
+
+def group_clips(group, sprites_dir=SPRITES_DIR):
+    """Load the frames of a manifest group's animation folders and sprite sheets
+
+    Returns a dict mapping clip name to (list of frame surfaces, source stamps).
+    """
+    clips = {}
+    for kind, path in ASSET_GROUPS[group].values():
+        files = clip_files(kind, path, sprites_dir)
+        if not files:
+            continue
+        if kind == 'folder':
+            frames = [pygame.image.load(f) for f in files]
+        else:
+            frames = slice_sheet(pygame.image.load(files[0]), parse_frame_size(path))
+        if frames:
+            clips[clip_name(kind, path)] = (frames, source_stamps(files, sprites_dir))
+    return clips
+
+
+def slice_sheet(sheet, frame_size):
+    """Cut a horizontal sprite sheet into frames of frame_size"""
+    frame_width, frame_height = frame_size
+    return [sheet.subsurface((i * frame_width, 0, frame_width, frame_height))
+            for i in range(sheet.get_width() // frame_width)]
+
+
+def pack_frames(sizes, page_size=ATLAS_PAGE_SIZE, padding=ATLAS_PADDING):
+    """Shelf-pack frame sizes into square pages
+
+    Frames are placed tallest first, left to right in rows ("shelves").
+    Returns a list of (page, x, y) placements in the same order as sizes.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placements = [None] * len(sizes)
+    page, x, y, shelf_height = 0, 0, 0, 0
+
+    for i in order:
+        width, height = sizes[i]
+        if width > page_size or height > page_size:
+            raise ValueError(f"Frame of size {width}x{height} does not fit in a {page_size} atlas page")
+
+        if x + width > page_size:
+            # Start a new shelf
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        if y + height > page_size:
+            # Start a new page
+            page += 1
+            x, y, shelf_height = 0, 0, 0
+
+        placements[i] = (page, x, y)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+
+    return placements
+
+
+def build_atlas(sprites_dir=SPRITES_DIR, atlas_dir=ATLAS_DIR, page_size=ATLAS_PAGE_SIZE):
+    """Pack each manifest group's clips into its own atlas pages and write the metadata file"""
+    metadata = {'page_size': page_size, 'groups': {}}
+    os.makedirs(atlas_dir, exist_ok=True)
+    frame_count = page_total = 0
+
+    for group in ASSET_GROUPS:
+        clips = group_clips(group, sprites_dir)
+        entries = [(name, index, frame) for name, (frames, _) in clips.items()
+                   for index, frame in enumerate(frames)]
+        if not entries:
+            continue
+        placements = pack_frames([frame.get_size() for _, _, frame in entries], page_size)
+
+        # Pages are cropped to the frames on them, so a small group stays small
+        page_count = max(p[0] for p in placements) + 1
+        extents = [[0, 0] for _ in range(page_count)]
+        for (_, _, frame), (page, x, y) in zip(entries, placements):
+            extents[page][0] = max(extents[page][0], x + frame.get_width())
+            extents[page][1] = max(extents[page][1], y + frame.get_height())
+        pages = [pygame.Surface(extent, pygame.SRCALPHA) for extent in extents]
+        group_metadata = {
+            'pages': [f'atlas_{group}_{i}.png' for i in range(page_count)],
+            'clips': {name: [None] * len(frames) for name, (frames, _) in clips.items()},
+            'sources': {name: stamps for name, (_, stamps) in clips.items()},
+        }
+
+        for (name, index, frame), (page, x, y) in zip(entries, placements):
+            pages[page].blit(frame, (x, y))
+            group_metadata['clips'][name][index] = [page, x, y, frame.get_width(), frame.get_height()]
+
+        for page, filename in zip(pages, group_metadata['pages']):
+            pygame.image.save(page, os.path.join(atlas_dir, filename))
+        metadata['groups'][group] = group_metadata
+        frame_count += len(entries)
+        page_total += page_count
+
+    with open(os.path.join(atlas_dir, ATLAS_METADATA), 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+    print(f"Packed {frame_count} frames from {len(metadata['groups'])} groups into {page_total} atlas page(s)")
+    return metadata
+
+
+def load_atlas(atlas_dir=ATLAS_DIR, sprites_dir=SPRITES_DIR):
+    """Read the atlas metadata (no pages are loaded), or return None if no atlas has been built
+
+    The result maps group name to {'pages': [...], 'clips': {...}}; pass it
+    to load_atlas_group() to load a group's frames. Clips whose source files
+    changed since the atlas was built are left out, so they load from the
+    files themselves until the atlas is rebuilt.
+    """
+    metadata_path = os.path.join(atlas_dir, ATLAS_METADATA)
+    if not os.path.exists(metadata_path):
+        return None
+
+    with open(metadata_path) as f:
+        atlas = json.load(f)['groups']
+
+    for group, group_metadata in atlas.items():
+        sources = group_metadata['sources']
+        current = {clip_name(kind, path): source_stamps(clip_files(kind, path, sprites_dir), sprites_dir)
+                   for kind, path in ASSET_GROUPS.get(group, {}).values()}
+        for clip in list(group_metadata['clips']):
+            if current.get(clip) != sources.get(clip):
+                print(f"Atlas clip {clip} is out of date (run python atlas.py), loading it from its files")
+                del group_metadata['clips'][clip]
+    return atlas
+
+
+def atlas_page_files(atlas, group, atlas_dir=ATLAS_DIR):
+    """Paths of the atlas pages a group's clips are packed into"""
+    return [os.path.join(atlas_dir, filename) for filename in atlas.get(group, {}).get('pages', [])]
+
+
+def load_atlas_group(atlas, group, load=pygame.image.load, atlas_dir=ATLAS_DIR):
+    """Load a group's atlas pages and return a dict of clip name -> list of subsurfaces
+
+    load decodes a page file. Requires the display to be set up, since the
+    pages are converted to the display format.
+    """
+    if group not in atlas:
+        return {}
+    pages = [load(path).convert_alpha() for path in atlas_page_files(atlas, group, atlas_dir)]
+
+    return {
+        name: [pages[page].subsurface((x, y, width, height))
+               for page, x, y, width, height in frames]
+        for name, frames in atlas[group]['clips'].items()
+    }
+
+
+if __name__ == '__main__':
+    build_atlas()
@@ -0,0 +1,31 @@
+"""
+Scrolling camera
+
+Levels are laid out in world coordinates and can be bigger than the
+screen. The Camera is the screen-sized viewport onto the world: it follows
+the player, stays inside the level's bounds, and its rect is passed as the
+view to everything that draws, which blits at world position minus view
+position. Only sprites in view are drawn and only those in view() (the
+view plus CAMERA_MARGIN) are animated, so a large level costs about the
+same per frame as a single screen.
+"""
+import pygame
+from config import *
+
+
+class Camera:
+    """Screen-sized viewport onto a level, kept inside the level's bounds"""
+
+    def __init__(self, bounds, size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        self.bounds = pygame.Rect(bounds)
+        self.rect = pygame.Rect((0, 0), size)  # The part of the world on screen
+        self.rect.clamp_ip(self.bounds)
+
+    def follow(self, target):
+        """Center the view on a rect, as far as the level's bounds allow"""
+        self.rect.center = target.center
+        self.rect.clamp_ip(self.bounds)
+
+    def view(self, margin=CAMERA_MARGIN):
+        """The viewport grown by margin on every side, for culling"""
+        return self.rect.inflate(2 * margin, 2 * margin)
@@ -0,0 +1,103 @@
+"""
+Swept (continuous) AABB collision
+
+Moving a box by its whole step and then testing for overlap lets it pass
+through thin platforms when the step is large (fast objects, or a low
+simulation rate). These functions sweep the box along its motion instead and
+report the time of impact: the fraction of the motion (0 to 1) covered
+before it first touches an obstacle.
+
+Moving boxes are (x, y, width, height) tuples so positions can be floats;
+obstacles are pygame.Rects, e.g. from a StaticGrid or TileGrid query_rects().
+
+Sprite-vs-sprite hits are pixel-perfect instead: a rect test first, then the
+sprites' precomputed frame masks only when the rects touch.
+"""
+import math
+import pygame
+
+
+def swept_bounds(box, dx, dy):
+    """Rect covering a box over its whole motion, for broadphase queries"""
+    x, y, width, height = box
+    left = math.floor(min(x, x + dx))
+    top = math.floor(min(y, y + dy))
+    right = math.ceil(max(x, x + dx) + width)
+    bottom = math.ceil(max(y, y + dy) + height)
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+def axis_times(start, size, delta, low, high):
+    """Entry and exit times of a moving [start, start + size] span with [low, high]"""
+    if delta > 0:
+        return (low - (start + size)) / delta, (high - start) / delta
+    if delta < 0:
+        return (high - start) / delta, (low - (start + size)) / delta
+    # Not moving on this axis: overlapping the whole time, or never
+    if start + size <= low or start >= high:
+        return math.inf, -math.inf
+    return -math.inf, math.inf
+
+
+def sweep(box, dx, dy, rect):
+    """Time of impact of box moving by (dx, dy) with rect, or None if it misses
+
+    Returns (toi, normal): toi is 0 to 1, normal the (x, y) direction of the
+    face of rect that was hit, e.g. (0, -1) when landing on top of it. A box
+    already touching rect hits it at time 0 if it moves into it; boxes that
+    already overlap rect are not reported. Hitting a corner exactly counts
+    as hitting the top or bottom face.
+    """
+    x, y, width, height = box
+    entry_x, exit_x = axis_times(x, width, dx, rect.left, rect.right)
+    entry_y, exit_y = axis_times(y, height, dy, rect.top, rect.bottom)
+
+    entry = max(entry_x, entry_y)
+    if entry < 0 or entry > 1 or entry >= min(exit_x, exit_y):
+        return None
+    if entry_x > entry_y:
+        return entry, (-1 if dx > 0 else 1, 0)
+    return entry, (0, -1 if dy > 0 else 1)
+
+
+def first_hit(box, dx, dy, rects):
+    """Earliest (toi, normal, rect) of box moving by (dx, dy) among rects, or None"""
+    best = None
+    for rect in rects:
+        hit = sweep(box, dx, dy, rect)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = (hit[0], hit[1], rect)
+    return best
+
+
+def mask_overlap(a, b):
+    """Where the visible pixels of sprites a and b overlap, as a rect, or None
+
+    Both sprites need a rect and a mask (see AssetManager.get_masks).
+    """
+    if not a.rect.colliderect(b.rect):
+        return None
+    offset = (b.rect.x - a.rect.x, b.rect.y - a.rect.y)
+    if a.mask.overlap(b.mask, offset) is None:
+        return None
+    rects = a.mask.overlap_mask(b.mask, offset).get_bounding_rects()
+    return rects[0].unionall(rects[1:]).move(a.rect.topleft)
+
+
+def visible_rows(sprite):
+    """Top and bottom of a sprite's visible pixels, relative to its rect"""
+    rects = sprite.mask.get_bounding_rects()
+    if not rects:
+        return 0, sprite.rect.height
+    return min(rect.top for rect in rects), max(rect.bottom for rect in rects)
+
+
+def landed_on(sprite, prev_y, other, depth=0):
+    """Whether sprite, at rect.y prev_y before its last step, came down onto the top of other's visible pixels
+
+    Judged from the step's motion and where sprite started it (its visible
+    bottom at most depth px below other's visible top), not from how deep
+    it overlaps after it, so a big step at a low SIM_RATE lands like small ones.
+    """
+    return (sprite.rect.y > prev_y and
+            prev_y + visible_rows(sprite)[1] <= other.rect.top + visible_rows(other)[0] + depth)
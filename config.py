@@ -6,6 +6,14 @@ Game constants and configuration settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
+FRAME_TIME_MS = 1000 / FPS  # Milliseconds per frame at the target frame rate
+RENDER_FPS = 144  # Frame rate cap while playing; frames are interpolated between simulation steps
+
+# Simulation settings
+SIM_RATE = 60  # Fixed simulation steps per second; movement and timers are scaled to the step, so 20-30 works too
+SIM_STEP_MS = 1000 / SIM_RATE
+MAX_SIM_STEPS = 5  # Most steps run in one frame to catch up; time beyond that is dropped
+PHYSICS_RATE = 60  # Speeds, gravity and timers are given per tick at this rate
 
 # Colors
 WHITE = (255, 255, 255)
@@ -30,16 +38,28 @@ MAX_FALL_SPEED = 20
 ENEMY_WIDTH = 40
 ENEMY_HEIGHT = 40
 ENEMY_SPEED = 2
+ENEMY_STOMP_DEPTH = 10  # How far (px) below an enemy's visible top a falling player's feet may start a step and still land on it
 
 # Boss settings
 BOSS_WIDTH = 80
 BOSS_HEIGHT = 100
 BOSS_SPEED = 3
+BOSS_STOMP_DEPTH = 25  # The same for landing on the boss
 BOSS_HEALTH = 5
+PROJECTILE_POOL_SIZE = 512  # Maximum live projectiles per shooter
 
 # Platform settings
 PLATFORM_HEIGHT = 20
 
+# Camera settings
+CAMERA_MARGIN = 64  # Pixels around the viewport where sprites are still animated (Camera.view)
+
+# Tiled map settings
+TILE_CHUNK_SIZE = 256  # Tile layers are pre-rendered into square chunks of this many pixels
+
+# Collision settings
+COLLISION_CELL_SIZE = 64  # Size of the spatial grid cells used for collision broadphase
+
 # Game settings
 STARTING_LIVES = 3
 POINTS_PER_COIN = 10
@@ -48,7 +68,15 @@ POINTS_PER_BOSS = 500
 
 # Level settings
 NUM_LEVELS = 3
+LEVEL_CACHE_SIZE = 3  # Level templates kept built, so restarts and replays don't reload them
+LEVEL_HOT_RELOAD = True  # Watch the level's TMX file and apply edits while it is played
+LEVEL_RELOAD_POLL_MS = 500  # How often the TMX file is checked for edits
 
 # Background settings
 BG_HORIZONTAL_OFFSET = -30  # Positive = shift right, Negative = shift left, 0 = center
-PLATFORM_HORIZONTAL_OFFSET = -5 # Should match BG_HORIZONTAL_OFFSET to keep platforms aligned
\ No newline at end of file
+PLATFORM_HORIZONTAL_OFFSET = -5 # Should match BG_HORIZONTAL_OFFSET to keep platforms aligned
+
+# Asset settings
+ASSET_MEMORY_BUDGET = 64 * 1024 * 1024  # Bytes of pixel data kept loaded before evicting unused asset groups
+ASSET_LOADER_THREADS = 4  # Worker threads used to decode images while the loading screen is shown
+ASSET_PREMULTIPLIED_ALPHA = False  # Also keep premultiplied-alpha copies of sprites for BLEND_PREMULTIPLIED blits
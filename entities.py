@@ -5,22 +5,19 @@ import pygame
 import random
 from config import *
 from assets import get_assets
+from animation import Animator
+from projectiles import ProjectilePool
 
 
 class Platform(pygame.sprite.Sprite):
-    def __init__(self, x, y, width):
+    def __init__(self, x, y, width, height=PLATFORM_HEIGHT):
         super().__init__()
-        # Load platform sprite and tile it
+        # Platforms of the same size share one tiled surface
         assets = get_assets()
         if assets:
-            sprite = assets.get_sprite('platform')
-            # Tile the platform sprite to match the width
-            self.image = pygame.Surface((width, PLATFORM_HEIGHT))
-            for i in range(0, width, sprite.get_width()):
-                tile = pygame.transform.scale(sprite, (min(sprite.get_width(), width - i), PLATFORM_HEIGHT))
-                self.image.blit(tile, (i, 0))
+            self.image = assets.get_platform_surface(width, height)
         else:
-            self.image = pygame.Surface((width, PLATFORM_HEIGHT))
+            self.image = pygame.Surface((width, height))
             self.image.fill(GRAY)
 
         self.rect = self.image.get_rect()
@@ -29,30 +26,32 @@ class Platform(pygame.sprite.Sprite):
 
 
 class Coin(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, phase=0):
         super().__init__()
         # Load coin sprite with animation support
         assets = get_assets()
-        self.animations = None
+        self.clip = None
+        self.animator = None
         self.has_animations = False
-        self.animation_frame = 0
-        self.animation_counter = 0
-        self.animation_speed = 0.15
+        # Set when the coin joins a SyncedAnimationGroup playing the same clip;
+        # phase offsets this coin's frame (in whole frames) from the group's
+        self.animation_group = None
+        self.animation_phase = phase
 
         if assets:
             # Try to load diamond animation first
             diamond_frames = assets.get_sprite('coin_diamond')
             if diamond_frames and isinstance(diamond_frames, list):
-                self.animations = diamond_frames
+                # Frames are pre-scaled 2x for visibility (18x14 -> 36x28)
+                self.clip = assets.get_clip('coin_diamond', (36, 28), owner='Coin')
+                self.animator = Animator(self.clip)
                 self.has_animations = True
-                # Set initial image from first frame (scaled up 2x for visibility)
-                frame = self.animations[0]
-                self.image = pygame.transform.scale(frame, (36, 28))  # 18x14 scaled 2x
+                self.image = self.animator.image
             else:
                 # Fallback to static coin sprite
-                sprite = assets.get_sprite('coin')
-                if sprite:
-                    self.image = pygame.transform.scale(sprite, (20, 20))
+                frames = assets.get_frames('coin', (20, 20), owner='Coin')
+                if frames:
+                    self.image = frames[0]
                 else:
                     self.image = pygame.Surface((20, 20))
                     self.image.fill(YELLOW)
@@ -64,20 +63,24 @@ class Coin(pygame.sprite.Sprite):
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
         self.rect.y = y
 
-    def update(self):
-        """Update coin animation"""
-        if not self.has_animations:
-            return
+    @property
+    def image(self):
+        """Current frame: the synced group's shared frame, or this coin's own"""
+        if self.animation_group:
+            return self.animation_group.frame(self.animation_phase)
+        return self._image
 
-        # Cycle through animation frames
-        self.animation_counter += self.animation_speed
-        if self.animation_counter >= 1:
-            self.animation_counter = 0
-            self.animation_frame = (self.animation_frame + 1) % len(self.animations)
+    @image.setter
+    def image(self, value):
+        self._image = value
 
-        # Get current frame and scale it
-        frame = self.animations[int(self.animation_frame)]
-        self.image = pygame.transform.scale(frame, (36, 28))  # 18x14 scaled 2x
+    def update(self, dt=FRAME_TIME_MS):
+        """Update coin animation (synced coins are animated by their group)"""
+        if not self.has_animations or self.animation_group:
+            return
+
+        self.animator.update(dt)
+        self.image = self.animator.image
 
 
 class Spike(pygame.sprite.Sprite):
@@ -87,6 +90,9 @@ class Spike(pygame.sprite.Sprite):
         # Create invisible spike hitbox
         self.image = pygame.Surface((width, height), pygame.SRCALPHA)
         self.image.fill((0, 0, 0, 0))  # Fully transparent
+        assets = get_assets()
+        if assets:
+            assets.track_surface(self.image, 'hitboxes', 'Spike')
 
         self.rect = self.image.get_rect()
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
@@ -101,9 +107,12 @@ class Enemy(pygame.sprite.Sprite):
         # Load enemy sprite with animation support
         assets = get_assets()
         self.animations = {}
+        self.flipped_animations = {}
         self.has_animations = False
         self.enemy_type = enemy_type
         self.current_animation = 'run'
+        self.mask = None
+        size = (ENEMY_WIDTH, ENEMY_HEIGHT)
 
         if assets:
             if enemy_type == 'cucumber':
@@ -112,16 +121,13 @@ class Enemy(pygame.sprite.Sprite):
                 run_frames = assets.get_sprite('enemy_cucumber_run')
 
                 if idle_frames and run_frames:
-                    self.animations['idle'] = idle_frames
-                    self.animations['run'] = run_frames
+                    self.load_animation('idle', 'enemy_cucumber_idle', size)
+                    self.load_animation('run', 'enemy_cucumber_run', size)
                     self.has_animations = True
-                    self.animation_frame = 0
-                    self.animation_counter = 0
-                    self.animation_speed = 0.2
 
                     # Set initial image from first run frame
-                    frame = self.animations['run'][0]
-                    self.image = pygame.transform.scale(frame, (ENEMY_WIDTH, ENEMY_HEIGHT))
+                    self.image = self.animations['run'].frames[0]
+                    self.mask = self.animations['run'].masks[0]
                 else:
                     self.image = pygame.Surface((ENEMY_WIDTH, ENEMY_HEIGHT))
                     self.image.fill(RED)
@@ -131,20 +137,18 @@ class Enemy(pygame.sprite.Sprite):
                 frames = assets.get_sprite(slime_type)
 
                 if frames and isinstance(frames, list):
-                    self.animations['run'] = frames
+                    self.load_animation('run', slime_type, size)
                     self.has_animations = True
-                    self.animation_frame = 0
-                    self.animation_counter = 0
-                    self.animation_speed = 0.15
 
                     # Set initial image from first frame
-                    frame = self.animations['run'][0]
-                    self.image = pygame.transform.scale(frame, (ENEMY_WIDTH, ENEMY_HEIGHT))
+                    self.image = self.animations['run'].frames[0]
+                    self.mask = self.animations['run'].masks[0]
                 else:
                     # Try single sprite file
-                    sprite = assets.get_sprite('enemy')
-                    if sprite:
-                        self.image = pygame.transform.scale(sprite, (ENEMY_WIDTH, ENEMY_HEIGHT))
+                    frames = assets.get_frames('enemy', size, owner='Enemy')
+                    if frames:
+                        self.image = frames[0]
+                        self.mask = assets.get_masks('enemy', size)[0]
                     else:
                         self.image = pygame.Surface((ENEMY_WIDTH, ENEMY_HEIGHT))
                         self.image.fill(RED)
@@ -155,51 +159,79 @@ class Enemy(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
         self.rect.y = y
+        # Collision mask of the current frame (placeholder boxes are solid)
+        if self.mask is None:
+            self.mask = pygame.mask.Mask(self.rect.size, fill=True)
+        # x before the last simulation step, for render interpolation
+        self.prev_x = self.rect.x
 
         self.start_x = x + PLATFORM_HORIZONTAL_OFFSET
         self.movement_range = movement_range
         self.direction = 1  # 1 for right, -1 for left
         self.speed = ENEMY_SPEED
+        self.pending_ticks = 0  # Physics ticks of dt not simulated yet
+        self.animator = Animator(self.animations.get(self.current_animation))
+
+        # Set when the patrol is simulated by a level's EnemySwarm
+        self.swarm = None
+        self.swarm_index = None
 
-    def update(self):
-        """Update enemy movement with simple patrol AI"""
-        self.rect.x += self.speed * self.direction
+    def kill(self):
+        """Remove the enemy from its groups and from its swarm"""
+        if self.swarm:
+            self.swarm.remove(self)
+        super().kill()
 
-        # Change direction when reaching movement range
-        if self.rect.x >= self.start_x + self.movement_range:
-            self.direction = -1
-        elif self.rect.x <= self.start_x:
-            self.direction = 1
+    def load_animation(self, anim_name, sprite_name, size):
+        """Store the shared pre-scaled clips of an animation for both facings"""
+        assets = get_assets()
+        self.animations[anim_name] = assets.get_clip(sprite_name, size, owner='Enemy')
+        self.flipped_animations[anim_name] = assets.get_clip(sprite_name, size, flip=True, owner='Enemy')
+
+    def update(self, dt=FRAME_TIME_MS):
+        """Update enemy movement with simple patrol AI, dt ms at a time
+
+        Patrols one physics tick at a time like EnemySwarm (which moves the
+        enemies of a level instead), so any dt gives the same path.
+        """
+        self.prev_x = self.rect.x
+        self.pending_ticks += dt * PHYSICS_RATE / 1000
+        ticks = int(self.pending_ticks + 1e-6)
+        self.pending_ticks = max(self.pending_ticks - ticks, 0)
+        for _ in range(ticks):
+            self.rect.x += self.speed * self.direction
+
+            # Change direction when reaching movement range
+            if self.rect.x >= self.start_x + self.movement_range:
+                self.direction = -1
+            elif self.rect.x <= self.start_x:
+                self.direction = 1
 
         # Update animation
-        self.update_animation()
+        self.update_animation(dt)
 
-    def update_animation(self):
+    def update_animation(self, dt=FRAME_TIME_MS):
         """Update enemy animation"""
         if not self.has_animations:
             return
 
-        # Get current animation frames
-        if self.current_animation in self.animations:
-            frames = self.animations[self.current_animation]
-        else:
+        if self.current_animation not in self.animations:
             return
 
-        # Cycle through animation frames
-        self.animation_counter += self.animation_speed
-        if self.animation_counter >= 1:
-            self.animation_counter = 0
-            self.animation_frame = (self.animation_frame + 1) % len(frames)
-
-        # Get current frame and scale it
-        frame = frames[int(self.animation_frame)]
-        scaled_frame = pygame.transform.scale(frame, (ENEMY_WIDTH, ENEMY_HEIGHT))
-
-        # Flip if moving left
+        # Use the pre-flipped clip if moving left, keeping the frame timing
         if self.direction == -1:
-            scaled_frame = pygame.transform.flip(scaled_frame, True, False)
+            clip = self.flipped_animations[self.current_animation]
+        else:
+            clip = self.animations[self.current_animation]
+        self.animator.play(clip, restart=False)
+
+        self.animator.update(dt)
+        self.image = self.animator.image
+        self.mask = self.animator.mask
 
-        self.image = scaled_frame
+    def render_position(self, alpha=1.0):
+        """Top-left to draw at, interpolated by alpha"""
+        return (round(self.prev_x + (self.rect.x - self.prev_x) * alpha), self.rect.y)
 
 
 class Boss(pygame.sprite.Sprite):
@@ -208,50 +240,58 @@ class Boss(pygame.sprite.Sprite):
         # Load boss sprite
         assets = get_assets()
         if assets:
-            sprite = assets.get_sprite('boss')
-            self.image = pygame.transform.scale(sprite, (BOSS_WIDTH, BOSS_HEIGHT))
+            self.image = assets.get_frames('boss', (BOSS_WIDTH, BOSS_HEIGHT), owner='Boss')[0]
+            self.mask = assets.get_masks('boss', (BOSS_WIDTH, BOSS_HEIGHT))[0]
         else:
             self.image = pygame.Surface((BOSS_WIDTH, BOSS_HEIGHT))
             self.image.fill((128, 0, 128))  # Purple
+            self.mask = pygame.mask.Mask((BOSS_WIDTH, BOSS_HEIGHT), fill=True)
 
         self.rect = self.image.get_rect()
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
         self.rect.y = y
+        self.pos_x = float(self.rect.x)  # Exact (sub-pixel) position; rect.x is this rounded
 
         self.health = BOSS_HEALTH
         self.max_health = BOSS_HEALTH
         self.speed = BOSS_SPEED
         self.direction = 1
         self.attack_timer = 0
-        self.projectiles = pygame.sprite.Group()
+        self.projectiles = ProjectilePool()
     
-    def update(self, player_x):
-        """Update boss with advanced AI"""
+    def update(self, player_x, dt=FRAME_TIME_MS, platforms=None, bounds=None):
+        """Update boss with advanced AI, dt ms at a time
+
+        Projectiles are stopped by platforms if platforms (a collision grid) is given.
+        The boss and its projectiles stay inside bounds (the level's world
+        rect, by default the screen).
+        """
+        if bounds is None:
+            bounds = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        ticks = dt * PHYSICS_RATE / 1000
+
         # Move towards player
         if player_x < self.rect.x:
-            self.rect.x -= self.speed
+            self.pos_x -= self.speed * ticks
         elif player_x > self.rect.x:
-            self.rect.x += self.speed
+            self.pos_x += self.speed * ticks
         
-        # Keep boss on screen
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
+        # Keep boss inside the world
+        self.pos_x = min(max(self.pos_x, bounds.left), bounds.right - self.rect.width)
+        self.rect.x = round(self.pos_x)
         
         # Attack timer
-        self.attack_timer += 1
+        self.attack_timer += ticks
         if self.attack_timer >= 90:  # Attack every 1.5 seconds
             self.shoot_projectile()
-            self.attack_timer = 0
+            self.attack_timer -= 90
         
-        # Update projectiles
-        self.projectiles.update()
+        # Move all projectiles in one batched step
+        self.projectiles.update(ticks, platforms, bounds)
     
     def shoot_projectile(self):
-        """Boss shoots a projectile"""
-        projectile = BossProjectile(self.rect.centerx, self.rect.centery)
-        self.projectiles.add(projectile)
+        """Boss shoots a projectile from the pool"""
+        self.projectiles.spawn(self.rect.centerx, self.rect.centery, 0, 7)
     
     def take_damage(self):
         """Boss takes damage"""
@@ -274,22 +314,3 @@ class Boss(pygame.sprite.Sprite):
         
         # Border
         pygame.draw.rect(screen, BLACK, (bar_x, bar_y, bar_width, bar_height), 2)
-
-
-class BossProjectile(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((10, 10))
-        self.image.fill((255, 100, 0))  # Orange
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.centery = y
-        self.speed = 7
-    
-    def update(self):
-        """Move projectile downward"""
-        self.rect.y += self.speed
-        
-        # Remove if off screen
-        if self.rect.top > SCREEN_HEIGHT:
-            self.kill()
\ No newline at end of file
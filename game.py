@@ -4,9 +4,11 @@ Main game class with game loop and state management
 import pygame
 from config import *
 from player import Player
-from level import Level
+from level_manager import LevelManager
+from camera import Camera
 from database import Database
 from UI import Button
+from collision import mask_overlap, landed_on
 
 
 class Game:
@@ -27,12 +29,15 @@ class Game:
         self.game_over = False
         self.game_won = False
         
-        # Initialize player and level
-        self.player = Player(100, SCREEN_HEIGHT - 150)
-        self.level = Level(self.current_level)
-        
-        # Clock
+        # Clock, how long the last frame took in ms, and the simulation steps not run yet
         self.clock = pygame.time.Clock()
+        self.frame_ms = SIM_STEP_MS
+        self.accumulator = 0
+
+        # Initialize player and level (the next level is prefetched in the background)
+        self.player = Player(100, SCREEN_HEIGHT - 150)
+        self.levels = LevelManager()
+        self.load_level(self.current_level)
     
     def handle_events(self):
         """Handle game events"""
@@ -61,8 +66,23 @@ class Game:
         self.game_over = False
         self.game_won = False
         self.player = Player(100, SCREEN_HEIGHT - 150)
-        self.level = Level(self.current_level)
+        self.load_level(self.current_level)  # From the cached template
     
+    def load_level(self, level_number):
+        """Switch to a level, with a camera scrolling over its world"""
+        self.level = self.levels.get(level_number)
+        self.camera = Camera(self.level.bounds)
+        self.camera.follow(self.player.rect)
+        self.reset_frame_clock()
+
+    def reset_frame_clock(self):
+        """Start timing the current frame from now
+
+        Called after something that blocks the game loop (loading a level,
+        the pause menu), so the time it took isn't simulated as catch-up steps.
+        """
+        self.clock.tick()
+
     def handle_input(self):
         """Handle continuous input"""
         keys = pygame.key.get_pressed()
@@ -80,31 +100,35 @@ class Game:
             return
         
         # Update player
-        self.player.update(self.level.platforms)
+        self.player.update(self.level.collision, SIM_STEP_MS, self.level.bounds)
         
-        # Update level
-        self.level.update(self.player)
+        # Update level (only what is near the camera is animated)
+        self.level.update(self.player, SIM_STEP_MS, self.camera.view())
         
+        # One spatial query finds every coin, spike, enemy and projectile touching the player
+        hits = self.level.collide(self.player.rect)
+
         # Check coin collection
-        coins_collected = pygame.sprite.spritecollide(self.player, self.level.coins, True)
-        for coin in coins_collected:
+        for coin in hits.get('coin', ()):
+            coin.kill()
             self.score += POINTS_PER_COIN
 
-        # Check spike collision (new enemy hazards)
-        spikes_hit = pygame.sprite.spritecollide(self.player, self.level.spikes, False)
-        if spikes_hit:
+        # Check spike collision (spike sprites and Tiled hazard tiles)
+        if hits.get('spike') or hits.get('hazard'):
             if self.player.take_damage():
                 if self.player.lives <= 0:
                     self.game_over = True
                 else:
                     self.player.reset_position(100, SCREEN_HEIGHT - 150)
 
-        # Check enemy collision
-        enemies_hit = pygame.sprite.spritecollide(self.player, self.level.enemies, False)
-        for enemy in enemies_hit:
-            # Check if player is jumping on enemy (landing on top)
-            if (self.player.rect.bottom <= enemy.rect.top + 15 and
-                self.player.vel_y > 0):
+        # Check enemy collision (pixel-perfect once the rects touch)
+        for enemy in hits.get('enemy', ()):
+            contact = mask_overlap(self.player, enemy)
+            if contact is None:
+                continue  # Only transparent pixels touch
+
+            # Check if player is jumping on enemy (falling onto its top)
+            if landed_on(self.player, self.player.prev_y, enemy, ENEMY_STOMP_DEPTH):
                 # Player defeats enemy by jumping on it
                 enemy.kill()
                 self.score += POINTS_PER_ENEMY
@@ -120,8 +144,9 @@ class Game:
         
         # Check boss level
         if self.level.boss:
-            # Check boss collision
-            if self.player.rect.colliderect(self.level.boss.rect):
+            # Check boss collision (pixel-perfect once the rects touch)
+            boss_contact = mask_overlap(self.player, self.level.boss)
+            if boss_contact:
                 if self.player.take_damage():
                     if self.player.lives <= 0:
                         self.game_over = True
@@ -129,20 +154,15 @@ class Game:
                         self.player.reset_position(100, SCREEN_HEIGHT - 150)
             
             # Check projectile collision
-            projectiles_hit = pygame.sprite.spritecollide(self.player, self.level.boss.projectiles, True)
-            if projectiles_hit:
+            if hits.get('projectile'):
                 if self.player.take_damage():
                     if self.player.lives <= 0:
                         self.game_over = True
                     else:
                         self.player.reset_position(100, SCREEN_HEIGHT - 150)
             
-            # Check if player can damage boss (by jumping on it)
-            # More forgiving collision - player's bottom must be near boss top
-            if (self.player.rect.bottom <= self.level.boss.rect.top + 25 and
-                self.player.rect.bottom >= self.level.boss.rect.top - 10 and
-                self.player.rect.colliderect(self.level.boss.rect) and
-                self.player.vel_y >= 0):
+            # Check if player can damage boss (by landing on top of it)
+            if boss_contact and landed_on(self.player, self.player.prev_y, self.level.boss, BOSS_STOMP_DEPTH):
 
                 if self.level.boss.take_damage():
                     self.score += POINTS_PER_BOSS
@@ -152,8 +172,8 @@ class Game:
 
                 self.player.vel_y = -JUMP_STRENGTH  # Bounce off boss
         
-        # Check if player fell off screen
-        if self.player.rect.top > SCREEN_HEIGHT:
+        # Check if player fell out of the world
+        if self.player.rect.top > self.level.bounds.bottom:
             if self.player.take_damage():
                 if self.player.lives <= 0:
                     self.game_over = True
@@ -171,33 +191,24 @@ class Game:
         if self.current_level > NUM_LEVELS:
             self.game_won = True
         else:
-            self.level = Level(self.current_level)
+            self.load_level(self.current_level)
             self.player.reset_position(100, SCREEN_HEIGHT - 150)
             self.player.lives = min(self.player.lives + 1, STARTING_LIVES)  # Bonus life
     
-    def draw(self):
-        """Draw everything"""
-        # Draw background based on current level
-        from assets import get_assets
-        assets = get_assets()
-        if assets:
-            bg = assets.get_background(f'level{self.current_level}')
-            if bg:
-                # Center the background (1280x960) on the screen (800x600)
-                # Apply horizontal offset from config
-                bg_x = -(bg.get_width() - SCREEN_WIDTH) // 2 + BG_HORIZONTAL_OFFSET
-                bg_y = -(bg.get_height() - SCREEN_HEIGHT) // 2
-                self.screen.blit(bg, (bg_x, bg_y))
-            else:
-                self.screen.fill((135, 206, 235))  # Sky blue background fallback
-        else:
-            self.screen.fill((135, 206, 235))  # Sky blue background fallback
+    def draw(self, alpha=1.0):
+        """Draw everything, interpolated by alpha (see step)"""
+        # The camera follows where the player is drawn, so the player doesn't jitter against the world
+        self.camera.follow(pygame.Rect(self.player.render_position(alpha), self.player.rect.size))
+        view = self.camera.rect
+
+        # Draw the level's static layer (background and platforms)
+        self.level.draw_static(self.screen, view)
 
         # Draw level
-        self.level.draw(self.screen)
+        self.level.draw(self.screen, alpha, view)
         
         # Draw player
-        self.player.draw(self.screen)
+        self.player.draw(self.screen, alpha, view)
         
         # Draw HUD
         self.draw_hud()
@@ -318,19 +329,40 @@ class Game:
             
             pygame.display.flip()
             self.clock.tick(FPS)
+
+        self.reset_frame_clock()
     
-    def run(self):
-        """Main game loop"""
-        while self.running:
-            self.handle_events()
+    def step(self):
+        """Run the fixed simulation steps the elapsed time calls for (at most MAX_SIM_STEPS)
 
+        Returns alpha, how far (0 to 1) the leftover time is into the next
+        step. Everything drawn is interpolated by it: sprites are drawn alpha
+        of the way from their position before the last step to their current one.
+        """
+        # Counted in steps rather than ms, so whole steps add up exactly
+        self.accumulator = min(self.accumulator + self.frame_ms * SIM_RATE / 1000, MAX_SIM_STEPS)
+        while self.accumulator >= 1:
             if not self.game_over and not self.game_won:
                 self.handle_input()
                 self.update()
+            self.accumulator -= 1
+        return self.accumulator
 
-            self.draw()
+    def run(self):
+        """Main game loop: fixed-rate simulation, interpolated rendering"""
+        while self.running:
+            self.handle_events()
+            # Apply edits to the level's TMX file (the world size may have changed)
+            if self.levels.poll(self.level):
+                self.camera = Camera(self.level.bounds)
+                self.reset_frame_clock()
+            alpha = self.step()
+
+            self.draw(alpha)
             pygame.display.flip()
-            self.clock.tick(FPS)
+            self.frame_ms = self.clock.tick(RENDER_FPS)
         
+        self.levels.shutdown()
+
         # Save score to database
         self.db.save_score(self.user_id, self.score, self.current_level)
\ No newline at end of file
@@ -1,35 +1,339 @@
 """
 Level layouts and configurations for the platform game
 """
+from collections import Counter
 import pygame
 from config import *
 from entities import Platform, Enemy, Coin, Boss, Spike
-from tiled_loader import load_level_from_tiled
+from tiled_loader import load_level_from_tiled, level_tmx_file
+from level_pack import source_signature
+from assets import get_assets
+from animation import SyncedAnimationGroup
+from swarm import EnemySwarm
+from spatial import StaticGrid, SpatialHash
+from camera import Camera
+
+
+def merge_runs(rects, vertical=False):
+    """Merge rects that line up exactly and touch or overlap, along rows (or columns if vertical)"""
+    if vertical:
+        # (x, width) must match, merge along y
+        keyed = sorted(((x, w), y, h) for x, y, w, h in rects)
+    else:
+        # (y, height) must match, merge along x
+        keyed = sorted(((y, h), x, w) for x, y, w, h in rects)
+
+    merged = []
+    for line, start, size in keyed:
+        if merged and merged[-1][0] == line and start <= merged[-1][1] + merged[-1][2]:
+            _, prev_start, prev_size = merged[-1]
+            merged[-1] = (line, prev_start, max(prev_start + prev_size, start + size) - prev_start)
+        else:
+            merged.append((line, start, size))
+
+    if vertical:
+        return [(x, y, w, h) for (x, w), y, h in merged]
+    return [(x, y, w, h) for (y, h), x, w in merged]
+
+
+def coalesce_platforms(specs):
+    """Merge adjacent and stacked platform rects into as few colliders as possible
+
+    specs are (x, y, width, height) tuples. Rows are merged into horizontal
+    runs and runs into vertical stacks, until nothing more can be merged.
+    """
+    rects = list(set(specs))
+    while True:
+        merged = merge_runs(merge_runs(rects), vertical=True)
+        if len(merged) == len(rects):
+            return sorted(merged, key=lambda r: (r[1], r[0]))
+        rects = merged
 
 
 class Level:
     """Represents a game level with platforms, enemies, and collectibles"""
 
-    def __init__(self, level_number):
+    def __init__(self, level_number, template=None):
+        """Instantiate a level's sprites and surfaces from its template (built here if not given)"""
+        if template is None:
+            template = LevelTemplate(level_number)
         self.level_number = level_number
-        self.platforms = []
+        self.template = template
+        self.platform_specs = template.platform_specs
+        self.tiled_loader = template.tiled_loader
+        self.player_spawn = template.player_spawn
+        self.hazards = template.hazards
+        self.bounds = pygame.Rect(template.bounds)  # The world, in which the camera scrolls
+        self.time_ms = 0  # Time since the level started, drives animated tiles
+
+        # Load (and keep loaded) the asset groups this level needs
+        assets = get_assets()
+        if assets:
+            assets.load_level_assets(level_number)
+
+        self.platforms = [Platform(x, y, width, height) for x, y, width, height in template.colliders]
         self.enemies = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
+        self.coins = SyncedAnimationGroup()  # Coins share one animation clock
         self.spikes = pygame.sprite.Group()  # Add spikes group
-        self.boss = None
-        self.tiled_loader = None
+        self.boss = Boss(*template.boss_spawn) if template.boss_spawn else None
+
+        # Broadphase index so collision checks only look at nearby platforms
+        self.build_platform_grid()
+
+        # Index of everything the player can touch, so hit tests only look nearby
+        self.sprite_index = SpatialHash()
+        for spike in self.spikes:
+            self.sprite_index.insert(spike, 'spike')
+
+        # Enemy patrols are simulated together in NumPy arrays
+        self.enemy_swarm = EnemySwarm(index=self.sprite_index)
+
+        # Live enemies and coins by the spawn they came from, so a reloaded
+        # template can be compared with what is already in the level
+        self.spawned = {}
+        self.spawn('coin', template.coin_spawns)
+        self.spawn('enemy', template.enemy_spawns)
+
+        # Everything that never changes during the level, pre-composited if the
+        # level fits on one screen (bigger ones draw the part in view every frame)
+        self.static_layer = None
+        if self.bounds.size == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.static_layer = self.build_static_layer()
+
+    def build_platform_grid(self):
+        """Index the platforms and label them for the debug overlay"""
+        self.platform_grid = StaticGrid(self.platforms)
+        # Tiled levels collide straight against their tile occupancy grid
+        self.collision = self.template.collision
+        if self.collision is None:
+            self.collision = self.platform_grid
+
+        # DEBUG: platform labels (index, x, width), only for visible platforms
+        font = pygame.font.Font(None, 16)
+        self.platform_labels = {
+            platform: font.render(f"#{i} x:{platform.rect.x} w:{platform.rect.width}", True, (255, 255, 0))
+            for i, platform in enumerate(self.platforms) if platform.rect.width > 10}
+
+    def spawn(self, kind, spawns):
+        """Create the sprites of some 'enemy' or 'coin' spawns (see LevelTemplate) and add them to the level"""
+        if kind == 'enemy':
+            sprites = [Enemy(x, y, movement_range, enemy_type) for x, y, movement_range, enemy_type in spawns]
+            self.enemies.add(sprites)
+            self.enemy_swarm.add(*sprites)
+        else:
+            sprites = [Coin(x, y, phase) for x, y, phase in spawns]
+            self.coins.add(sprites)
+
+        for spawn, sprite in zip(spawns, sprites):
+            self.spawned.setdefault((kind, spawn), []).append(sprite)
+            self.sprite_index.insert(sprite, kind)
+
+    def apply_template(self, template):
+        """Switch to an edited version of this level's template, rebuilding only what changed
+
+        Used to hot reload a level while it is played. Platforms, enemies and
+        coins whose spawn didn't change are kept as they are (collected
+        coins stay collected, enemies keep patrolling), removed ones go and
+        new ones are spawned. Only the tile chunks whose tiles changed are
+        rendered again.
+        """
+        old = self.template
+        self.template = template
+        self.platform_specs = template.platform_specs
+        self.player_spawn = template.player_spawn
+        self.hazards = template.hazards
+        self.bounds = pygame.Rect(template.bounds)
+
+        # Colliders: keep the Platform sprites of unchanged rects
+        platforms = dict(zip(old.colliders, self.platforms))
+        self.platforms = [platforms.get(spec) or Platform(*spec) for spec in template.colliders]
+        colliders_changed = len(set(old.colliders) ^ set(template.colliders))
+        # Each parse makes a new TileGrid, so compare the tiles themselves
+        if template.collision is None:
+            collision_changed = old.collision is not None
+        else:
+            collision_changed = not template.collision.same_tiles(old.collision)
+        if colliders_changed or collision_changed:
+            self.build_platform_grid()
+
+        # Spawns, compared as multisets: the same spawn twice is two sprites
+        spawns_changed = 0
+        for kind, old_spawns, new_spawns in (('coin', old.coin_spawns, template.coin_spawns),
+                                             ('enemy', old.enemy_spawns, template.enemy_spawns)):
+            old_counts, new_counts = Counter(old_spawns), Counter(new_spawns)
+            for spawn, count in (old_counts - new_counts).items():
+                sprites = self.spawned[(kind, spawn)]
+                for _ in range(count):
+                    sprites.pop().kill()
+                if not sprites:
+                    del self.spawned[(kind, spawn)]
+                spawns_changed += count
+            added = list((new_counts - old_counts).elements())
+            self.spawn(kind, added)
+            spawns_changed += len(added)
+
+        if template.boss_spawn != old.boss_spawn:
+            self.boss = Boss(*template.boss_spawn) if template.boss_spawn else None
+            spawns_changed += 1
+
+        # Tile chunks: re-render only the chunks whose tiles changed
+        chunks_changed = None
+        self.tiled_loader = template.tiled_loader
+        if self.tiled_loader and old.tiled_loader:
+            chunks_changed = self.tiled_loader.adopt_chunks(old.tiled_loader)
+
+        self.static_layer = None
+        if self.bounds.size == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.static_layer = self.build_static_layer()
+
+        print(f"Reloaded level {self.level_number}: {colliders_changed} colliders, "
+              f"{spawns_changed} spawns and {'all' if chunks_changed is None else chunks_changed} "
+              f"tile chunks changed")
+
+    def build_static_layer(self):
+        """Composite the background, Tiled background layers and platform art
+
+        Built once when the level loads as an opaque screen-sized surface, so
+        each frame starts with a single blit instead of redrawing all of it.
+        """
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.paint_static(surface, surface.get_rect())
+
+        assets = get_assets()
+        if assets:
+            assets.track_surface(surface, 'static_layer', 'Level')
+        return surface
+
+    def paint_static(self, surface, view):
+        """Draw the background, Tiled background layers and platform art in view (a world rect) onto surface"""
+        # Draw background based on level number
+        assets = get_assets()
+        bg = assets.get_background(f'level{self.level_number}') if assets else None
+        if bg:
+            # Center the background (1280x960) on the screen (800x600)
+            # Apply horizontal offset from config
+            bg_x = -(bg.get_width() - SCREEN_WIDTH) // 2 + BG_HORIZONTAL_OFFSET
+            bg_y = -(bg.get_height() - SCREEN_HEIGHT) // 2
+            if not bg.get_rect(topleft=(bg_x, bg_y)).contains(view):
+                surface.fill((135, 206, 235))  # The world reaches past the background
+            surface.blit(bg, (bg_x - view.x, bg_y - view.y))
+        else:
+            surface.fill((135, 206, 235))  # Sky blue background fallback
+
+        # Tiled background (non-collision) tile layers
+        if self.tiled_loader:
+            self.tiled_loader.render_background_layers(surface, view)
+
+        # DEBUG: Show red boxes to see platform positions with labels
+        for platform in self.platform_grid.query(view):
+            rect = platform.rect.move(-view.x, -view.y)
+            pygame.draw.rect(surface, (255, 0, 0), rect, 2)  # Red outline
+            label = self.platform_labels.get(platform)
+            if label:
+                surface.blit(label, (rect.x + 2, rect.y - 15))
+
+    def update(self, player, dt=FRAME_TIME_MS, view=None):
+        """Update level entities (dt is the step time in ms)
+
+        Enemies and coins outside view (the camera's view(), by default a
+        camera at the start of the level) are simulated but not animated.
+        """
+        self.time_ms += dt
+        if view is None:
+            view = Camera(self.bounds).view()
+
+        # Update enemies (all patrols in one batched step)
+        self.enemy_swarm.update(dt, view, 0)
+
+        # Update coins (one shared animation clock for the whole group)
+        self.coins.update(dt, view)
+
+        # Update boss if exists
+        if self.boss:
+            self.boss.update(player.rect.x, dt, self.collision, self.bounds)
+
+    def collide(self, rect):
+        """Everything overlapping rect, as a dict of kind -> hits
+
+        'coin', 'spike' and 'enemy' map to lists of sprites; 'projectile' is
+        the number of boss projectiles hit (they are freed), and 'hazard' is
+        set if rect touches a hazard tile.
+        """
+        hits = self.sprite_index.query(rect)
+        if self.hazards is not None and self.hazards.touches(rect):
+            hits['hazard'] = True
+        if self.boss:
+            projectiles_hit = self.boss.projectiles.collide(rect)
+            if projectiles_hit:
+                hits['projectile'] = projectiles_hit
+        return hits
+
+    def draw_static(self, screen, view=None):
+        """Draw the background, tile layers and platforms in view (pre-composited if the level fits on screen)"""
+        if self.static_layer is not None:
+            screen.blit(self.static_layer, (0, 0))
+        else:
+            self.paint_static(screen, view or screen.get_rect())
+
+    def draw(self, screen, alpha=1.0, view=None):
+        """Draw the level entities in view (the camera's rect), interpolated by alpha"""
+        if view is None:
+            view = screen.get_rect()
+
+        # Animated Tiled tiles, on top of the pre-rendered static layer
+        if self.tiled_loader:
+            self.tiled_loader.draw_animated_tiles(screen, self.time_ms, view)
+
+        # Draw enemies (cucumber with animations), only the ones the swarm synced near the view
+        blits = []
+        for enemy in self.enemy_swarm.visible_sprites():
+            x, y = enemy.render_position(alpha)
+            blits.append((enemy.image, (x - view.x, y - view.y)))
+        screen.blits(blits, doreturn=False)
+
+        # Draw coins (diamond with animations)
+        coins = self.sprite_index.query(view).get('coin', ())
+        screen.blits([(coin.image, coin.rect.move(-view.x, -view.y)) for coin in coins], doreturn=False)
+
+        # Spikes are invisible hazards (no drawing needed)
+
+
+class LevelTemplate:
+    """Everything about a level's layout that isn't a sprite or surface
+
+    Building one parses the Tiled map (or runs the hardcoded layout) and
+    merges the colliders, but creates no surfaces, so it can happen on a
+    worker thread. Levels are instantiated from a template and never change
+    it, so one template can start the same level any number of times.
+    """
+
+    def __init__(self, level_number):
+        self.level_number = level_number
+        # The TMX file as it was when the template was built, to notice edits
+        self.tmx_file = level_tmx_file(level_number)
+        self.source_signature = source_signature(self.tmx_file)
+        self.platform_specs = []  # (x, y, width, height) before coalescing
+        self.enemy_spawns = []  # (x, y, movement range, enemy type)
+        self.coin_spawns = []  # (x, y, animation phase)
+        self.boss_spawn = None
         self.player_spawn = None
+        self.tiled_loader = None
+        self.collision = None  # TileGrid of solid tiles, for Tiled levels
+        self.hazards = None  # TileGrid of hazard tiles, for Tiled levels that have them
 
         # Try to load from Tiled first
         tiled_data = load_level_from_tiled(level_number)
         if tiled_data:
             print(f"Loading level {level_number} from Tiled map")
-            self.platforms = tiled_data['platforms']
-            self.enemies = tiled_data['enemies']
-            self.coins = tiled_data['coins']
-            self.boss = tiled_data['boss']
+            self.platform_specs = tiled_data['platforms']
+            self.enemy_spawns = [(x, y, movement_range, 'cucumber')
+                                 for x, y, movement_range in tiled_data['enemies']]
+            self.coin_spawns = tiled_data['coins']
+            self.boss_spawn = tiled_data['boss']
             self.player_spawn = tiled_data.get('player_spawn')
             self.tiled_loader = tiled_data.get('loader')
+            self.collision = tiled_data.get('collision')
+            self.hazards = tiled_data.get('hazards')
         else:
             # Fallback to hardcoded levels
             print(f"Loading level {level_number} from hardcoded data")
@@ -40,38 +344,26 @@ class Level:
             elif level_number == 3:
                 self.load_level_3()
 
-    def update(self, player):
-        """Update level entities"""
-        # Update enemies
-        for enemy in self.enemies:
-            enemy.update()
+        # Merge adjacent and stacked platforms into the fewest colliders
+        self.colliders = coalesce_platforms(self.platform_specs)
 
-        # Update coins (for animations)
-        for coin in self.coins:
-            coin.update()
+        # The world is the Tiled map (hardcoded layouts are one screen), and at least a screen
+        width, height = SCREEN_WIDTH, SCREEN_HEIGHT
+        if self.tiled_loader:
+            width, height = max(self.tiled_loader.width, width), max(self.tiled_loader.height, height)
+        self.bounds = (0, 0, width, height)
 
-        # Update boss if exists
-        if self.boss:
-            self.boss.update(player.rect.x)
+    def add_platform(self, x, y, width, height=PLATFORM_HEIGHT):
+        """Add a platform to the level layout (built once the layout is complete)"""
+        self.platform_specs.append((x, y, width, height))
 
-    def draw(self, screen):
-        """Draw all level entities"""
-        # DEBUG: Show red boxes to see platform positions with labels
-        font = pygame.font.Font(None, 16)
-        for i, platform in enumerate(self.platforms):
-            pygame.draw.rect(screen, (255, 0, 0), platform.rect, 2)  # Red outline
-            # Draw platform info (index, x, width)
-            if platform.rect.width > 10:  # Only label visible platforms
-                text = font.render(f"#{i} x:{platform.rect.x} w:{platform.rect.width}", True, (255, 255, 0))
-                screen.blit(text, (platform.rect.x + 2, platform.rect.y - 15))
+    def add_enemy(self, x, y, movement_range=100, enemy_type='cucumber'):
+        """Add an enemy spawn to the level layout"""
+        self.enemy_spawns.append((x, y, movement_range, enemy_type))
 
-        # Draw enemies (cucumber with animations)
-        self.enemies.draw(screen)
-
-        # Draw coins (diamond with animations)
-        self.coins.draw(screen)
-
-        # Spikes are invisible hazards (no drawing needed)
+    def add_coin(self, x, y, phase=0):
+        """Add a coin spawn to the level layout"""
+        self.coin_spawns.append((x, y, phase))
 
     def load_level_1(self):
         """Level 1 layout - aligned with centered demo.png background"""
@@ -82,38 +374,38 @@ class Level:
 
         # Add invisible walls on left and right edges to prevent falling off
         for y in range(0, SCREEN_HEIGHT, 20):
-            self.platforms.append(Platform(-50, y, 50))  # Left wall
+            self.add_platform(-50, y, 50)  # Left wall
             # Right wall is added separately below
 
         # Bottom left ground platform (lowest visible platform on left)
-        self.platforms.append(Platform(40, 540, 350))
+        self.add_platform(40, 540, 350)
 
         # Lower middle platforms (around the small stone platforms)
-        self.platforms.append(Platform(345, 510, 40))
+        self.add_platform(345, 510, 40)
 
         #piattaforme centrali
-        self.platforms.append(Platform(400, 480, 40))
+        self.add_platform(400, 480, 40)
 
-        self.platforms.append(Platform(455, 450, 30))
+        self.add_platform(455, 450, 30)
  
-        self.platforms.append(Platform(476, 410, 30))
+        self.add_platform(476, 410, 30)
         
-        self.platforms.append(Platform(600, 410, 150))  # Small platform
+        self.add_platform(600, 410, 150)  # Small platform
 
         # Right wall - ONLY at bottom, next to chest area
         for y in range(500, SCREEN_HEIGHT, 20):
-            self.platforms.append(Platform(SCREEN_WIDTH, y, 0))  # Right wall partial
+            self.add_platform(SCREEN_WIDTH, y, 50)  # Right wall partial
 
 
         # cucumber enemies 
-        self.enemies.add(Enemy(150, 485, 80, enemy_type='cucumber'))  # First platform - patrols left side
-        self.enemies.add(Enemy(460, 355, 50, enemy_type='cucumber'))  # Small platform with tree
+        self.add_enemy(150, 485, 80, enemy_type='cucumber')  # First platform - patrols left side
+        self.add_enemy(460, 355, 50, enemy_type='cucumber')  # Small platform with tree
        
 
         # Add coins scattered across platforms
-        self.coins.add(Coin(80, 440))
-        self.coins.add(Coin(325, 430))
-        self.coins.add(Coin(410, 400))
+        self.add_coin(80, 440)
+        self.add_coin(325, 430)
+        self.add_coin(410, 400)
        # Top platform
 
         
@@ -121,43 +413,43 @@ class Level:
     def load_level_2(self):
         """Level 2 layout - more challenging"""
         # Ground platform
-        self.platforms.append(Platform(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH))
+        self.add_platform(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH)
 
         # Additional platforms - tighter jumps
-        self.platforms.append(Platform(100, 470, 120))
-        self.platforms.append(Platform(280, 410, 120))
-        self.platforms.append(Platform(460, 350, 120))
-        self.platforms.append(Platform(640, 290, 120))
-        self.platforms.append(Platform(300, 230, 180))
+        self.add_platform(100, 470, 120)
+        self.add_platform(280, 410, 120)
+        self.add_platform(460, 350, 120)
+        self.add_platform(640, 290, 120)
+        self.add_platform(300, 230, 180)
 
         # More enemies
-        self.enemies.add(Enemy(110, 430, 70))
-        self.enemies.add(Enemy(290, 370, 70))
-        self.enemies.add(Enemy(470, 310, 70))
+        self.add_enemy(110, 430, 70)
+        self.add_enemy(290, 370, 70)
+        self.add_enemy(470, 310, 70)
 
         # More coins
-        self.coins.add(Coin(140, 445))
-        self.coins.add(Coin(320, 385))
-        self.coins.add(Coin(500, 325))
-        self.coins.add(Coin(680, 265))
-        self.coins.add(Coin(350, 205))
+        self.add_coin(140, 445)
+        self.add_coin(320, 385)
+        self.add_coin(500, 325)
+        self.add_coin(680, 265)
+        self.add_coin(350, 205)
 
     def load_level_3(self):
         """Level 3 layout - boss level"""
         # Ground platform
-        self.platforms.append(Platform(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH))
+        self.add_platform(0, SCREEN_HEIGHT - 50, SCREEN_WIDTH)
 
         # Platforms for boss fight - positioned to allow jumping on boss
         # Left platform - for dodging
-        self.platforms.append(Platform(50, 420, 120))
+        self.add_platform(50, 420, 120)
         # Right platform - for dodging
-        self.platforms.append(Platform(630, 420, 120))
+        self.add_platform(630, 420, 120)
         # Center high platform - to jump down on boss
-        self.platforms.append(Platform(300, 300, 200))
+        self.add_platform(300, 300, 200)
         # Side platforms at medium height
-        self.platforms.append(Platform(100, 350, 120))
-        self.platforms.append(Platform(580, 350, 120))
+        self.add_platform(100, 350, 120)
+        self.add_platform(580, 350, 120)
 
         # Boss - positioned lower on the ground for easier access
         # Boss will patrol the ground level
-        self.boss = Boss(SCREEN_WIDTH // 2 - BOSS_WIDTH // 2, SCREEN_HEIGHT - 50 - BOSS_HEIGHT)
\ No newline at end of file
+        self.boss_spawn = (SCREEN_WIDTH // 2 - BOSS_WIDTH // 2, SCREEN_HEIGHT - 50 - BOSS_HEIGHT)
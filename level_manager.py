@@ -0,0 +1,125 @@
+"""
+Level manager: builds levels ahead of time and caches them
+
+Building a level used to freeze the game at every level transition. Most
+of that work (reading the Tiled map or its pack, merging colliders,
+decoding images) doesn't touch the display, so the manager does it for
+level n + 1 on a worker thread while level n is played, as a LevelTemplate.
+Only the final step - creating the sprites, converting images and
+compositing the static layer - happens on the main thread.
+
+Built templates are kept in a small LRU cache, so restarting a level
+instantiates it from its pristine template instead of loading it again.
+
+The manager also hot reloads levels: poll() checks the played level's TMX
+file every LEVEL_RELOAD_POLL_MS, rebuilds its template on the worker when
+it changes, and has the level apply the differences in place (see
+Level.apply_template), keeping the player and score.
+"""
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import *
+from assets import get_assets
+from level import Level, LevelTemplate
+from level_pack import source_signature
+
+
+def build_template(level_number):
+    """Build a level template and decode its images (runs on the worker thread)"""
+    template = LevelTemplate(level_number)
+    assets = get_assets()
+    if assets:
+        assets.decode_level_assets(level_number)
+    return template
+
+
+class LevelManager:
+    """Hands out levels, prefetching the next one on a worker thread"""
+
+    def __init__(self, cache_size=LEVEL_CACHE_SIZE):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cache_size = cache_size
+        self.templates = OrderedDict()  # level number -> LevelTemplate, least recently used first
+        self.pending = {}  # level number -> Future of a template being built
+        # Hot reload: (level number, Future of its new template) being built,
+        # the TMX signature that last failed to load, and when files were last checked
+        self.reloading = None
+        self.failed_signature = None
+        self.last_poll = 0
+
+    def prefetch(self, level_number):
+        """Start building a level's template in the background, unless it is built or being built"""
+        if level_number > NUM_LEVELS or level_number in self.templates or level_number in self.pending:
+            return
+        self.pending[level_number] = self.executor.submit(build_template, level_number)
+
+    def template(self, level_number):
+        """A level's template, waiting for (or doing) the build if it isn't cached"""
+        template = self.templates.get(level_number)
+        if template is not None:
+            self.templates.move_to_end(level_number)
+            return template
+
+        future = self.pending.pop(level_number, None)
+        template = future.result() if future else LevelTemplate(level_number)
+        self._store(level_number, template)
+        return template
+
+    def _store(self, level_number, template):
+        """Cache a template as the most recently used, dropping the least recently used past cache_size"""
+        self.templates[level_number] = template
+        self.templates.move_to_end(level_number)
+        while len(self.templates) > self.cache_size:
+            self.templates.popitem(last=False)
+
+    def get(self, level_number):
+        """A fresh Level, instantiated from its template; starts prefetching the level after it"""
+        level = Level(level_number, self.template(level_number))
+        self.prefetch(level_number + 1)
+        return level
+
+    def shutdown(self):
+        """Stop the worker thread (a build in progress is left to finish)"""
+        self.executor.shutdown(wait=False)
+
+    def poll(self, level):
+        """Hot reload the level being played if its TMX file changed
+
+        Cheap to call every frame: files are only checked every
+        LEVEL_RELOAD_POLL_MS, and the new template is built on the worker.
+        Returns True when an edit has just been applied to level.
+        """
+        if self.reloading:
+            level_number, future = self.reloading
+            if not future.done():
+                return False
+            self.reloading = None
+            template = future.result()
+            if level_number != level.level_number:
+                return False
+            if template.tiled_loader is None and template.source_signature is not None:
+                # Saved halfway or broken: keep playing the old version until the next save
+                print(f"Could not reload level {level_number}, keeping the loaded version")
+                self.failed_signature = template.source_signature
+                return False
+            self._store(level_number, template)
+            level.apply_template(template)
+            return True
+
+        now = time.monotonic()
+        if not LEVEL_HOT_RELOAD or (now - self.last_poll) * 1000 < LEVEL_RELOAD_POLL_MS:
+            return False
+        self.last_poll = now
+
+        # Cached templates of other levels are dropped if their file changed, and rebuilt when needed
+        for level_number, template in list(self.templates.items()):
+            if level_number != level.level_number and \
+                    source_signature(template.tmx_file) != template.source_signature:
+                del self.templates[level_number]
+
+        signature = source_signature(level.template.tmx_file)
+        if signature != level.template.source_signature and signature != self.failed_signature:
+            print(f"Level {level.level_number} changed, reloading")
+            self.reloading = (level.level_number, self.executor.submit(LevelTemplate, level.level_number))
+        return False
@@ -0,0 +1,193 @@
+"""
+Compiled level packs
+
+Parsing a TMX file with pytmx is slow, and used to happen on every level
+(re)start. A level pack holds everything the game needs from a TMX file, in
+a binary file stored next to it (assets/levels/level1.tmx ->
+assets/levels/level1.pack):
+
+- tile layers as arrays of tile ids
+- the tiles used, as tileset image regions, and tile animations
+- object spawns with their properties
+- the merged collider rects of the collision layers
+
+A pack is read with a single file read. It records a hash of the TMX file
+and its external tilesets, and is recompiled when they change. Compile all
+levels ahead of time with:
+
+    python level_pack.py
+
+File layout:
+
+    MAGIC (4 bytes) | VERSION (u32) | INDEX_SIZE (u32) | index JSON | tile arrays (u32)
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import struct
+
+import numpy as np
+import pytmx
+
+
+LEVELS_DIR = os.path.join(os.path.dirname(__file__), 'assets', 'levels')
+
+MAGIC = b'PGLP'
+VERSION = 2  # Bump when the pack contents or how colliders are built change
+HEADER = struct.Struct('<4sII')
+TILE_DTYPE = np.dtype('<u4')
+
+
+def pack_path(tmx_file):
+    """Where the compiled pack of a TMX file is stored"""
+    return os.path.splitext(tmx_file)[0] + '.pack'
+
+
+def content_hash(tmx_file):
+    """Hash of a TMX file and the external tilesets it uses"""
+    digest = hashlib.sha1(struct.pack('<I', VERSION))
+    with open(tmx_file, 'rb') as f:
+        tmx = f.read()
+    digest.update(tmx)
+    base_dir = os.path.dirname(tmx_file)
+    for source in re.findall(rb'<tileset[^>]*source="([^"]+)"', tmx):
+        tileset = os.path.join(base_dir, source.decode('utf-8'))
+        if os.path.exists(tileset):
+            with open(tileset, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def source_signature(tmx_file):
+    """Cheap check for edits to a TMX file: its (mtime, size), or None if it doesn't exist"""
+    try:
+        stat = os.stat(tmx_file)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def read_tmx(tmx_file):
+    """Parse a TMX file (without loading any images) into a level map dict
+
+    The dict has the map and tile sizes, 'layers' (visible tile layers, each
+    with a 'tiles' array of tile ids indexed [row, column]), 'objects',
+    'tiles' (tile id -> [image path relative to the TMX, x, y, width, height,
+    flip x, flip y, flip diagonal], where width and height are None for a
+    tile that is a whole image, from an image collection tileset) and
+    'animations' (tile id -> [[tile id, duration ms], ...]).
+    """
+    tmx_data = pytmx.TiledMap(tmx_file)
+    base_dir = os.path.dirname(tmx_file)
+
+    layers = []
+    objects = []
+    for layer in tmx_data.visible_layers:
+        if isinstance(layer, pytmx.TiledTileLayer):
+            layers.append({
+                'name': layer.name,
+                'tiles': np.array(layer.data, dtype=TILE_DTYPE).reshape(tmx_data.height, tmx_data.width),
+            })
+        elif isinstance(layer, pytmx.TiledObjectGroup):
+            for obj in layer:
+                objects.append({
+                    'name': obj.name,
+                    'type': obj.type,
+                    'x': obj.x,
+                    'y': obj.y,
+                    'properties': dict(obj.properties),
+                })
+
+    tiles = {}
+    for gid, image in enumerate(tmx_data.images):
+        if image:
+            filename, rect, flags = image
+            # Image collection tiles have no region (or flags): they are the whole image
+            x, y, width, height = rect or (0, 0, None, None)
+            tiles[gid] = [os.path.relpath(filename, base_dir), x, y, width, height,
+                          bool(flags and flags.flipped_horizontally), bool(flags and flags.flipped_vertically),
+                          bool(flags and flags.flipped_diagonally)]
+
+    animations = {}
+    for gid, properties in tmx_data.tile_properties.items():
+        frames = properties.get('frames')
+        if frames:
+            animations[gid] = [[frame.gid, frame.duration] for frame in frames]
+
+    return {
+        'width': tmx_data.width,
+        'height': tmx_data.height,
+        'tilewidth': tmx_data.tilewidth,
+        'tileheight': tmx_data.tileheight,
+        'layers': layers,
+        'objects': objects,
+        'tiles': tiles,
+        'animations': animations,
+    }
+
+
+def write_pack(tmx_file, level_map, source_hash=None):
+    """Write a level map (see read_tmx, plus 'colliders') as the TMX file's pack"""
+    index = {key: value for key, value in level_map.items() if key != 'layers'}
+    index['source_hash'] = source_hash or content_hash(tmx_file)
+    index['layers'] = []
+    arrays = []
+    offset = 0
+    for layer in level_map['layers']:
+        tiles = np.ascontiguousarray(layer['tiles'], dtype=TILE_DTYPE)
+        index['layers'].append({'name': layer['name'], 'offset': offset, 'shape': list(tiles.shape)})
+        arrays.append(tiles.tobytes())
+        offset += tiles.nbytes
+
+    # Values of custom properties Tiled may give that JSON can't hold are kept as text
+    index_bytes = json.dumps(index, default=str).encode('utf-8')
+    with open(pack_path(tmx_file), 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for data in arrays:
+            f.write(data)
+
+
+def read_pack(tmx_file, source_hash=None):
+    """Read a TMX file's pack as a level map, or None if it is missing or out of date"""
+    path = pack_path(tmx_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, index_size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        index = json.loads(data[HEADER.size:HEADER.size + index_size])
+        pack_hash = index.pop('source_hash')
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"Could not read level pack {path}: {e}")
+        return None
+
+    if pack_hash != (source_hash or content_hash(tmx_file)):
+        return None
+
+    arrays_start = HEADER.size + index_size
+    for layer in index['layers']:
+        rows, cols = layer.pop('shape')
+        layer['tiles'] = np.frombuffer(data, TILE_DTYPE, rows * cols,
+                                       arrays_start + layer.pop('offset')).reshape(rows, cols)
+    # JSON object keys are strings, tile ids are ints
+    index['tiles'] = {int(gid): tile for gid, tile in index['tiles'].items()}
+    index['animations'] = {int(gid): frames for gid, frames in index['animations'].items()}
+    return index
+
+
+def compile_levels(levels_dir=LEVELS_DIR):
+    """Compile the packs of the TMX files in levels_dir that are missing or out of date"""
+    from tiled_loader import TiledMapLoader
+
+    for tmx_file in sorted(glob.glob(os.path.join(levels_dir, '*.tmx'))):
+        TiledMapLoader(tmx_file)
+
+
+if __name__ == '__main__':
+    compile_levels()
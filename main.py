@@ -7,6 +7,8 @@ from config import *
 from login import LoginScreen
 from game import Game
 from assets import init_assets
+from manifest import groups_for_level
+from UI import LoadingScreen
 
 
 def main():
@@ -18,8 +20,11 @@ def main():
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Platform Adventure")
 
-    # Initialize assets AFTER creating the screen
-    init_assets()
+    # Initialize assets AFTER creating the screen, decoding the first
+    # level's images in the background while a loading screen is shown
+    assets = init_assets()
+    loading_screen = LoadingScreen(screen)
+    assets.preload(groups_for_level(1), loading_screen.update)
     
     # Main loop
     running = True
@@ -0,0 +1,154 @@
+"""
+Asset manifest: which asset groups exist and which ones each level and entity type needs
+
+Assets are loaded by group, on first request. Each group maps asset names
+(as passed to AssetManager.get_sprite / get_background) to a source:
+
+    ('folder', path)      animation frames from a folder of PNGs in assets/sprites
+    ('sheet', path)       animation frames sliced from a sprite sheet in assets/sprites
+    ('image', filename)   single sprite image in assets/sprites
+    ('background', file)  background in assets/backgrounds, scaled to the screen
+    ('backdrop', file)    background in assets/backgrounds, kept at its original size
+"""
+from config import PLAYER_WIDTH, PLAYER_HEIGHT, ENEMY_WIDTH, ENEMY_HEIGHT, BOSS_WIDTH, BOSS_HEIGHT
+
+
+ASSET_GROUPS = {
+    'player': {
+        'player_idle': ('folder', 'Captain Clown Nose without Sword/01-Idle'),
+        'player_walk': ('folder', 'Captain Clown Nose without Sword/02-Run'),
+        'player_jump': ('folder', 'Captain Clown Nose without Sword/03-Jump'),
+        'player': ('image', 'player.png'),
+    },
+    'cucumber': {
+        'enemy_cucumber_idle': ('folder', '3-Enemy-Cucumber/1-Idle'),
+        'enemy_cucumber_run': ('folder', '3-Enemy-Cucumber/2-Run'),
+    },
+    'slime': {
+        'enemy_green': ('folder', 'SlimeGreen'),
+        'enemy_orange': ('folder', 'SlimeOrange'),
+        'enemy': ('image', 'enemy.png'),
+    },
+    'coin': {
+        'coin_diamond': ('sheet', 'big diamond idles/Big Diamond Idle (18x14).png'),
+        'coin': ('image', 'coin.png'),
+    },
+    'platform': {
+        'platform': ('image', 'platform.png'),
+    },
+    'boss': {
+        'boss': ('image', 'boss.png'),
+    },
+    'ship': {
+        'ship_idle': ('folder', 'Ship/Ship/Idle'),
+        'ship_hit': ('folder', 'Ship/Ship/Hit'),
+        'ship_destroyed': ('folder', 'Ship/Destroyed'),
+        'ship_anchor': ('folder', 'Ship/Anchor'),
+        'ship_sail_wind': ('folder', 'Ship/Sail/Wind'),
+        'ship_sail_no_wind': ('folder', 'Ship/Sail/No Wind'),
+    },
+    'water': {
+        'water_top': ('folder', 'Water/Water/Top'),
+        'water_bottom': ('folder', 'Water/Water/Bottom'),
+        'water_reflex_1': ('folder', 'Water/Reflexes 1'),
+        'water_reflex_2': ('folder', 'Water/Reflexes 2'),
+        'water_splash_1': ('folder', 'Water/Water Splash 1'),
+        'water_splash_2': ('folder', 'Water/Water Splash 2'),
+    },
+    'barrel': {
+        'barrel_idle': ('folder', 'Barrel/Idle'),
+        'barrel_hit': ('folder', 'Barrel/Hit'),
+        'barrel_destroyed': ('folder', 'Barrel/Destroyed'),
+    },
+    'box': {
+        'box_idle': ('folder', 'Box/Idle'),
+        'box_hit': ('folder', 'Box/Hit'),
+        'box_destroyed': ('folder', 'Box/Destroyed'),
+    },
+    'chest': {
+        'chest_idle': ('folder', 'Chest/Idle'),
+        'chest_padlock': ('folder', 'Chest/Padlock'),
+        'chest_unlocked': ('folder', 'Chest/Unlocked'),
+        'chest_key_idle': ('folder', 'Chest Key/Idle'),
+        'chest_key_effect': ('folder', 'Chest Key/Effect'),
+    },
+    'background_demo': {
+        'demo': ('backdrop', 'demo.png'),
+    },
+    'background_level1': {
+        'level1': ('background', 'level1.png'),
+    },
+    'background_level2': {
+        'level2': ('background', 'level2.png'),
+    },
+    'background_level3': {
+        'level3': ('background', 'level3.png'),
+    },
+}
+
+# Sizes entities draw each sprite at, pre-scaled by the compiled asset cache
+RENDER_SIZES = {
+    'player_idle': [(PLAYER_WIDTH, PLAYER_HEIGHT)],
+    'player_walk': [(PLAYER_WIDTH, PLAYER_HEIGHT)],
+    'player_jump': [(PLAYER_WIDTH, PLAYER_HEIGHT)],
+    'player': [(PLAYER_WIDTH, PLAYER_HEIGHT)],
+    'enemy_cucumber_idle': [(ENEMY_WIDTH, ENEMY_HEIGHT)],
+    'enemy_cucumber_run': [(ENEMY_WIDTH, ENEMY_HEIGHT)],
+    'enemy_green': [(ENEMY_WIDTH, ENEMY_HEIGHT)],
+    'enemy_orange': [(ENEMY_WIDTH, ENEMY_HEIGHT)],
+    'enemy': [(ENEMY_WIDTH, ENEMY_HEIGHT)],
+    'coin_diamond': [(36, 28)],
+    'coin': [(20, 20)],
+    'boss': [(BOSS_WIDTH, BOSS_HEIGHT)],
+}
+
+# How long each animation frame is shown, in milliseconds
+CLIP_FRAME_MS = {
+    'player_idle': 117,
+    'player_walk': 117,
+    'player_jump': 117,
+    'enemy_cucumber_idle': 83,
+    'enemy_cucumber_run': 83,
+    'enemy_green': 117,
+    'enemy_orange': 117,
+    'coin_diamond': 117,
+}
+DEFAULT_FRAME_MS = 100
+
+# Asset groups needed by each entity type
+ENTITY_ASSETS = {
+    'player': ['player'],
+    'cucumber': ['cucumber'],
+    'slime': ['slime'],
+    'coin': ['coin'],
+    'platform': ['platform'],
+    'boss': ['boss'],
+    'ship': ['ship'],
+    'water': ['water'],
+    'barrel': ['barrel'],
+    'box': ['box'],
+    'chest': ['chest'],
+}
+
+# Entity types that appear in each level
+LEVEL_ENTITIES = {
+    1: ['player', 'platform', 'cucumber', 'coin'],
+    2: ['player', 'platform', 'cucumber', 'coin'],
+    3: ['player', 'platform', 'boss'],
+}
+
+# Backgrounds fall back to the shared demo backdrop when a level has none of its own
+DEFAULT_BACKGROUND = 'demo'
+
+
+def groups_for_entity(entity_type):
+    """Get the asset groups an entity type needs"""
+    return ENTITY_ASSETS.get(entity_type, [])
+
+
+def groups_for_level(level_number):
+    """Get the asset groups a level needs, including its background"""
+    groups = ['background_demo', f'background_level{level_number}']
+    for entity_type in LEVEL_ENTITIES.get(level_number, []):
+        groups.extend(group for group in groups_for_entity(entity_type) if group not in groups)
+    return groups
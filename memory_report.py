@@ -0,0 +1,69 @@
+"""
+Asset memory report
+
+Loads every level the way the game does and prints how much pixel memory
+the assets, derived surfaces and entity types hold, largest first:
+
+    python memory_report.py            # all levels
+    python memory_report.py 2          # only level 2
+    python memory_report.py --all      # also load every manifest group
+"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from config import *
+from assets import init_assets
+from manifest import ASSET_GROUPS
+
+
+def format_bytes(size):
+    """Human readable byte count"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def print_section(title, sizes):
+    """Print one report section sorted by size"""
+    print(f"\n{title}")
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {format_bytes(size):>10}  {name}")
+
+
+def main(args):
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    assets = init_assets()
+
+    # Imported after the asset manager exists, like in the game
+    from level import Level
+    from player import Player
+
+    level_numbers = [int(arg) for arg in args if arg.isdigit()] or range(1, NUM_LEVELS + 1)
+    if '--all' in args:
+        for group in ASSET_GROUPS:
+            assets.require_group(group)
+
+    # Keep the objects alive so their surfaces are counted
+    player = Player(100, SCREEN_HEIGHT - 150)
+    levels = [Level(number) for number in level_numbers]
+
+    report = assets.memory_report()
+    print_section("Assets", report['assets'])
+    print_section("Derived surfaces", report['derived'])
+    print_section("Entity types (own surfaces)",
+                  {owner: sizes['own'] for owner, sizes in report['entities'].items()})
+    print_section("Entity types (shared frames used)",
+                  {owner: sizes['shared'] for owner, sizes in report['entities'].items()})
+    print(f"\nTotal: {format_bytes(report['total'])}")
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -4,6 +4,8 @@ Player class with movement, jumping, and collision detection
 import pygame
 from config import *
 from assets import get_assets
+from animation import Animator
+from collision import swept_bounds, first_hit
 
 
 class Player(pygame.sprite.Sprite):
@@ -13,25 +15,32 @@ class Player(pygame.sprite.Sprite):
         # Load player animations from asset manager
         assets = get_assets()
         self.animations = {}
+        self.flipped_animations = {}
         self.has_animations = False
+        self.mask = None
+        size = (PLAYER_WIDTH, PLAYER_HEIGHT)
 
         if assets:
-            # Try to load animation frames
+            # Try to load animation frames, pre-scaled and pre-flipped
             idle_frames = assets.get_sprite('player_idle')
-            walk_frames = assets.get_sprite('player_walk')
-            jump_frames = assets.get_sprite('player_jump')
 
             if idle_frames and isinstance(idle_frames, list):
-                self.animations['idle'] = idle_frames
-                self.animations['walk'] = walk_frames if walk_frames else idle_frames
-                self.animations['jump'] = jump_frames if jump_frames else idle_frames
+                for anim_name, sprite_name in (('idle', 'player_idle'),
+                                               ('walk', 'player_walk'),
+                                               ('jump', 'player_jump')):
+                    if not assets.get_sprite(sprite_name):
+                        sprite_name = 'player_idle'
+                    self.animations[anim_name] = assets.get_clip(sprite_name, size, owner='Player')
+                    self.flipped_animations[anim_name] = assets.get_clip(sprite_name, size, flip=True, owner='Player')
                 self.has_animations = True
-                self.image = pygame.transform.scale(idle_frames[0], (PLAYER_WIDTH, PLAYER_HEIGHT))
+                self.image = self.animations['idle'].frames[0]
+                self.mask = self.animations['idle'].masks[0]
             else:
                 # Try single sprite
-                sprite = assets.get_sprite('player')
-                if sprite:
-                    self.image = pygame.transform.scale(sprite, (PLAYER_WIDTH, PLAYER_HEIGHT))
+                frames = assets.get_frames('player', size, owner='Player')
+                if frames:
+                    self.image = frames[0]
+                    self.mask = assets.get_masks('player', size)[0]
                 else:
                     self.image = pygame.Surface((PLAYER_WIDTH, PLAYER_HEIGHT))
                     self.image.fill(GREEN)
@@ -42,12 +51,17 @@ class Player(pygame.sprite.Sprite):
         self.rect = self.image.get_rect()
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
         self.rect.y = y
+        # Collision mask of the current frame (placeholder boxes are solid)
+        if self.mask is None:
+            self.mask = pygame.mask.Mask(self.rect.size, fill=True)
+        # Exact (sub-pixel) position; the rect is this rounded
+        self.pos_x, self.pos_y = float(self.rect.x), float(self.rect.y)
+        # Position before the last simulation step, for render interpolation
+        self.prev_x, self.prev_y = self.rect.topleft
 
         # Animation state
         self.current_animation = 'idle'
-        self.animation_frame = 0
-        self.animation_speed = 0.15  # Frames per game tick
-        self.animation_counter = 0
+        self.animator = Animator(self.animations.get('idle'))
 
         self.vel_x = 0
         self.vel_y = 0
@@ -57,57 +71,82 @@ class Player(pygame.sprite.Sprite):
         self.invincible_timer = 0
         self.facing_right = True
     
-    def update(self, platforms):
-        """Update player position and handle physics"""
+    def update(self, platforms, dt=FRAME_TIME_MS, bounds=None):
+        """Update player position and handle physics for a dt ms step"""
+        self.prev_x, self.prev_y = self.rect.topleft
+        ticks = dt * PHYSICS_RATE / 1000
+
         # Handle invincibility timer
         if self.invincible:
-            self.invincible_timer -= 1
+            self.invincible_timer -= ticks
             if self.invincible_timer <= 0:
                 self.invincible = False
         
-        # Apply gravity
-        self.vel_y += GRAVITY
-        if self.vel_y > MAX_FALL_SPEED:
-            self.vel_y = MAX_FALL_SPEED
-        
-        # Horizontal movement
-        self.rect.x += self.vel_x
-        self.check_collision_x(platforms)
-        
-        # Vertical movement
-        self.rect.y += self.vel_y
-        self.on_ground = False
-        self.check_collision_y(platforms)
+        # Apply gravity and move, swept against the platforms
+        self.move(ticks, platforms)
         
-        # Keep player on screen
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
+        # Keep player inside the world
+        if bounds is None:
+            bounds = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.pos_x = min(max(self.pos_x, bounds.left), bounds.right - self.rect.width)
+        self.rect.topleft = (round(self.pos_x), round(self.pos_y))
 
         # Update animation
-        self.update_animation()
-    
-    def check_collision_x(self, platforms):
-        """Check for horizontal collisions with platforms"""
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_x > 0:  # Moving right
-                    self.rect.right = platform.rect.left
-                elif self.vel_x < 0:  # Moving left
-                    self.rect.left = platform.rect.right
-    
-    def check_collision_y(self, platforms):
-        """Check for vertical collisions with platforms"""
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect):
-                if self.vel_y > 0:  # Falling
-                    self.rect.bottom = platform.rect.top
-                    self.vel_y = 0
+        self.update_animation(dt)
+
+    def fall(self, ticks):
+        """Apply gravity for a number of physics ticks and return the distance fallen
+
+        Matches applying GRAVITY, capping at MAX_FALL_SPEED and moving once
+        per tick, but in one step.
+        """
+        vel_y = self.vel_y
+        # Ticks until the fall speed is capped
+        free_ticks = min(max((MAX_FALL_SPEED - vel_y) / GRAVITY, 0), ticks)
+        dy = vel_y * free_ticks + GRAVITY * free_ticks * (free_ticks + 1) / 2
+        self.vel_y = min(vel_y + GRAVITY * free_ticks, MAX_FALL_SPEED)
+        return dy + MAX_FALL_SPEED * (ticks - free_ticks)
+
+    def box(self):
+        """Exact position and size as an (x, y, width, height) tuple"""
+        return (self.pos_x, self.pos_y, self.rect.width, self.rect.height)
+
+    def move(self, ticks, platforms):
+        """Move for a number of physics ticks, stopping against platforms and sliding along them
+
+        The move is swept, so it can't pass through platforms however long
+        it is. Sets on_ground when landing on a platform.
+        """
+        self.on_ground = False
+        dx = self.vel_x * ticks
+        dy = self.fall(ticks)
+        # At most one hit per axis (plus falling again after a ceiling) can happen
+        for _ in range(4):
+            box = self.box()
+            hit = first_hit(box, dx, dy, platforms.query_rects(swept_bounds(box, dx, dy)))
+            if hit is None:
+                self.pos_x += dx
+                self.pos_y += dy
+                return
+
+            toi, (normal_x, normal_y), platform = hit
+            ticks *= 1 - toi
+            # Advance to the point of impact, then keep only the motion along the face
+            if normal_x:
+                self.pos_x = platform.left - self.rect.width if normal_x < 0 else platform.right
+                self.pos_y += dy * toi
+                dx, dy = 0, dy * (1 - toi)
+            else:
+                self.pos_x += dx * toi
+                self.vel_y = 0
+                if normal_y < 0:  # Landed
+                    self.pos_y = platform.top - self.rect.height
                     self.on_ground = True
-                elif self.vel_y < 0:  # Jumping
-                    self.rect.top = platform.rect.bottom
-                    self.vel_y = 0
+                    dy = 0
+                else:  # Bumped a ceiling while jumping, start falling for the rest of the move
+                    self.pos_y = platform.bottom
+                    dy = self.fall(ticks)
+                dx *= 1 - toi
     
     def jump(self):
         """Make the player jump if on ground"""
@@ -137,7 +176,7 @@ class Player(pygame.sprite.Sprite):
             return True
         return False
 
-    def update_animation(self):
+    def update_animation(self, dt=FRAME_TIME_MS):
         """Update player animation based on state"""
         if not self.has_animations:
             return
@@ -150,37 +189,37 @@ class Player(pygame.sprite.Sprite):
         else:
             new_animation = 'idle'
 
-        # Reset frame if animation changed
-        if new_animation != self.current_animation:
-            self.current_animation = new_animation
-            self.animation_frame = 0
-            self.animation_counter = 0
-
-        # Update animation frame
-        self.animation_counter += self.animation_speed
-        if self.animation_counter >= 1:
-            self.animation_counter = 0
-            self.animation_frame = (self.animation_frame + 1) % len(self.animations[self.current_animation])
-
-        # Get current frame and scale it
-        frames = self.animations[self.current_animation]
-        frame = frames[int(self.animation_frame)]
-        scaled_frame = pygame.transform.scale(frame, (PLAYER_WIDTH, PLAYER_HEIGHT))
+        # Restart the clip if the animation changed, keep its timing if only the facing did
+        restart = new_animation != self.current_animation
+        self.current_animation = new_animation
+        if self.facing_right:
+            clip = self.animations[new_animation]
+        else:
+            clip = self.flipped_animations[new_animation]
+        self.animator.play(clip, restart)
 
-        # Flip if facing left
-        if not self.facing_right:
-            scaled_frame = pygame.transform.flip(scaled_frame, True, False)
+        self.animator.update(dt)
+        self.image = self.animator.image
+        self.mask = self.animator.mask
 
-        self.image = scaled_frame
+    def render_position(self, alpha=1.0):
+        """Top-left to draw at, interpolated by alpha"""
+        return (round(self.prev_x + (self.rect.x - self.prev_x) * alpha),
+                round(self.prev_y + (self.rect.y - self.prev_y) * alpha))
 
-    def draw(self, screen):
-        """Draw the player with invincibility flashing effect"""
+    def draw(self, screen, alpha=1.0, view=None):
+        """Draw the player with invincibility flashing effect, relative to view (the camera's rect)"""
         if not self.invincible or (self.invincible_timer % 10 < 5):
-            screen.blit(self.image, self.rect)
+            x, y = self.render_position(alpha)
+            if view is not None:
+                x, y = x - view.x, y - view.y
+            screen.blit(self.image, (x, y))
     
     def reset_position(self, x, y):
         """Reset player to starting position"""
         self.rect.x = x + PLATFORM_HORIZONTAL_OFFSET
         self.rect.y = y
+        self.pos_x, self.pos_y = float(self.rect.x), float(self.rect.y)
+        self.prev_x, self.prev_y = self.rect.topleft  # Don't interpolate the jump back
         self.vel_x = 0
         self.vel_y = 0
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Pooled, batch-integrated projectiles
+
+All of a shooter's projectiles live in one preallocated ProjectilePool:
+positions and velocities are rows of NumPy arrays, integrated and culled in
+one vectorized step, and hit-tested against the player in another. Every
+projectile is drawn with the same shared image, so firing allocates nothing.
+"""
+import numpy as np
+import pygame
+from config import *
+from assets import get_assets
+from collision import swept_bounds, first_hit
+
+
+class ProjectilePool:
+    """Fixed-capacity pool of projectiles simulated as arrays"""
+
+    def __init__(self, capacity=PROJECTILE_POOL_SIZE, size=(10, 10), color=(255, 100, 0)):
+        self.capacity = capacity
+        self.size = size
+        # Top-left positions and velocities (pixels per tick) of every slot
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.prev_pos = np.zeros((capacity, 2), dtype=np.float32)  # Before the last tick
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # One image shared by every projectile
+        self.image = pygame.Surface(size)
+        self.image.fill(color)  # Orange
+        assets = get_assets()
+        if assets:
+            assets.track_surface(self.image, 'projectiles', 'ProjectilePool')
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    def spawn(self, centerx, centery, vel_x=0, vel_y=7):
+        """Fire a projectile centered on (centerx, centery)
+
+        Returns False (and fires nothing) if every slot is in use.
+        """
+        free = np.flatnonzero(~self.active)
+        if not len(free):
+            return False
+
+        slot = free[0]
+        self.pos[slot] = (centerx - self.size[0] // 2, centery - self.size[1] // 2)
+        self.prev_pos[slot] = self.pos[slot]
+        self.vel[slot] = (vel_x, vel_y)
+        self.active[slot] = True
+        return True
+
+    def update(self, steps=1, platforms=None, bounds=None):
+        """Move every projectile by steps ticks and free the ones that left bounds
+
+        bounds is the level's world rect, by default the screen. If platforms
+        (a StaticGrid or TileGrid) is given, projectiles whose path crosses
+        one are freed too, however far they moved.
+        """
+        self.prev_pos[:] = self.pos
+        self.pos += self.vel * steps
+        if platforms is not None:
+            self.hit_platforms(platforms)
+
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        width, height = self.size
+        if bounds is None:
+            bounds = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        inside = ((y <= bounds.bottom) & (y + height >= bounds.top)
+                  & (x <= bounds.right) & (x + width >= bounds.left))
+        self.active &= inside
+
+    def hit_platforms(self, platforms):
+        """Free the projectiles whose last move was blocked by a platform"""
+        width, height = self.size
+        for slot in np.flatnonzero(self.active).tolist():
+            x, y = self.prev_pos[slot].tolist()
+            dx, dy = (self.pos[slot] - self.prev_pos[slot]).tolist()
+            box = (x, y, width, height)
+            if first_hit(box, dx, dy, platforms.query_rects(swept_bounds(box, dx, dy))):
+                self.active[slot] = False
+
+    def collide(self, rect, kill=True):
+        """Count the projectiles overlapping rect, freeing them if kill is set"""
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        width, height = self.size
+        hits = (self.active
+                & (x < rect.right) & (x + width > rect.left)
+                & (y < rect.bottom) & (y + height > rect.top))
+        if kill:
+            self.active &= ~hits
+        return int(np.count_nonzero(hits))
+
+    def clear(self):
+        """Free every projectile"""
+        self.active[:] = False
+
+    def draw(self, screen, alpha=1.0, view=None):
+        """Blit every active projectile with the shared image, interpolated by alpha and relative to view"""
+        active = self.active
+        prev = self.prev_pos[active]
+        positions = prev + (self.pos[active] - prev) * alpha
+        if view is not None:
+            positions -= view.topleft
+        positions = np.rint(positions).astype(np.int32).tolist()
+        screen.blits([(self.image, position) for position in positions], doreturn=False)
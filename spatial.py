@@ -0,0 +1,193 @@
+"""
+Spatial indexes for collision broadphase
+
+StaticGrid buckets things that never move (platforms) into uniform grid
+cells once, when a level loads. A collision check then only looks at the
+things in the cells its rect overlaps, so its cost stays flat as levels
+grow to thousands of pieces.
+
+SpatialHash does the same for sprites that move or disappear (enemies,
+coins, spikes): it is updated incrementally, and a moving sprite is only
+re-bucketed when it crosses into another cell.
+
+TileGrid keeps a Tiled tile layer as a 2D occupancy array instead of
+sprites, so a lookup just reads the tiles under a rect.
+
+StaticGrid and TileGrid both offer query_rects(rect), the solid rects near a
+rect, which is what movement collision works with.
+"""
+import numpy as np
+import pygame
+from config import *
+
+
+def cell_span(rect, cell_size):
+    """First and last cell columns and rows covered by a rect: (left, top, right, bottom)"""
+    # A zero-sized rect still sits in the cell of its corner
+    return (rect.left // cell_size, rect.top // cell_size,
+            max(rect.right - 1, rect.left) // cell_size, max(rect.bottom - 1, rect.top) // cell_size)
+
+
+def span_cells(span):
+    """Cells (cx, cy) in a cell span"""
+    left, top, right, bottom = span
+    return [(cx, cy) for cx in range(left, right + 1) for cy in range(top, bottom + 1)]
+
+
+def cell_range(rect, cell_size):
+    """Cells (cx, cy) covered by a rect"""
+    return span_cells(cell_span(rect, cell_size))
+
+
+class StaticGrid:
+    """Uniform grid index over sprites that never move, built once"""
+
+    def __init__(self, items, cell_size=COLLISION_CELL_SIZE):
+        self.items = list(items)
+        self.cell_size = cell_size
+        self.cells = {}
+        for index, item in enumerate(self.items):
+            for cell in cell_range(item.rect, cell_size):
+                self.cells.setdefault(cell, []).append(index)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def query(self, rect):
+        """Items in the cells rect overlaps, in the order they were added
+
+        This is a broadphase: the items are candidates that may not actually
+        overlap rect.
+        """
+        cells = self.cells
+        indices = set()
+        for cell in cell_range(rect, self.cell_size):
+            bucket = cells.get(cell)
+            if bucket:
+                indices.update(bucket)
+        return [self.items[index] for index in sorted(indices)]
+
+    def query_rects(self, rect):
+        """Rects of the items near rect (a broadphase, like query)"""
+        return [item.rect for item in self.query(rect)]
+
+
+class SpatialHash:
+    """Incrementally updated grid index over moving and collectible sprites
+
+    Each sprite is inserted with a kind (e.g. 'coin', 'enemy') used to sort
+    query results. Sprites that have been killed are dropped lazily, the
+    next time a query finds them.
+    """
+
+    def __init__(self, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # sprite -> (kind, cell span, insertion order)
+        self.entries = {}
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def insert(self, sprite, kind):
+        """Add a sprite to the index"""
+        span = cell_span(sprite.rect, self.cell_size)
+        self.entries[sprite] = (kind, span, self.next_order)
+        self.next_order += 1
+        for cell in span_cells(span):
+            self.cells.setdefault(cell, set()).add(sprite)
+
+    def remove(self, sprite):
+        """Remove a sprite from the index"""
+        entry = self.entries.pop(sprite, None)
+        if entry is None:
+            return
+        for cell in span_cells(entry[1]):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(sprite)
+                if not bucket:
+                    del self.cells[cell]
+
+    def move(self, sprite):
+        """Update a sprite's cells after it moved (cheap if it stayed in the same cells)"""
+        entry = self.entries.get(sprite)
+        if entry is None:
+            return
+        kind, span, order = entry
+        new_span = cell_span(sprite.rect, self.cell_size)
+        if new_span == span:
+            return
+
+        self.remove(sprite)
+        self.entries[sprite] = (kind, new_span, order)
+        for cell in span_cells(new_span):
+            self.cells.setdefault(cell, set()).add(sprite)
+
+    def query(self, rect):
+        """Sprites whose rect overlaps rect, as a dict of kind -> sprites in insertion order"""
+        cells = self.cells
+        candidates = set()
+        for cell in cell_range(rect, self.cell_size):
+            bucket = cells.get(cell)
+            if bucket:
+                candidates.update(bucket)
+
+        entries = self.entries
+        hits = {}
+        for sprite in sorted(candidates, key=lambda sprite: entries[sprite][2]):
+            if not sprite.alive():
+                self.remove(sprite)
+            elif sprite.rect.colliderect(rect):
+                hits.setdefault(entries[sprite][0], []).append(sprite)
+        return hits
+
+
+class TileGrid:
+    """Occupancy array of a tile layer: which tiles are filled, indexed [row, column]
+
+    origin_x is the world x of the grid's left edge, e.g. the
+    PLATFORM_HORIZONTAL_OFFSET that Platform sprites are shifted by.
+    """
+
+    def __init__(self, occupied, tile_width, tile_height, origin_x=0):
+        self.occupied = np.asarray(occupied, dtype=bool)
+        self.rows, self.cols = self.occupied.shape
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.origin_x = origin_x
+
+    def __len__(self):
+        return int(np.count_nonzero(self.occupied))
+
+    def window(self, rect):
+        """Column and row slices of the tiles a rect covers, clipped to the map"""
+        rect = rect.move(-self.origin_x, 0)
+        left = max(rect.left // self.tile_width, 0)
+        top = max(rect.top // self.tile_height, 0)
+        right = min(max(rect.right - 1, rect.left) // self.tile_width + 1, self.cols)
+        bottom = min(max(rect.bottom - 1, rect.top) // self.tile_height + 1, self.rows)
+        return slice(left, max(right, left)), slice(top, max(bottom, top))
+
+    def touches(self, rect):
+        """Whether any filled tile overlaps rect"""
+        cols, rows = self.window(rect)
+        return bool(self.occupied[rows, cols].any())
+
+    def query_rects(self, rect):
+        """Rects of the filled tiles under rect"""
+        cols, rows = self.window(rect)
+        width, height = self.tile_width, self.tile_height
+        return [pygame.Rect(self.origin_x + (cols.start + col) * width, (rows.start + row) * height, width, height)
+                for row, col in np.argwhere(self.occupied[rows, cols]).tolist()]
+
+    def same_tiles(self, other):
+        """Whether other is a TileGrid with the same filled tiles in the same place"""
+        return (isinstance(other, TileGrid) and
+                (self.tile_width, self.tile_height, self.origin_x) ==
+                (other.tile_width, other.tile_height, other.origin_x) and
+                np.array_equal(self.occupied, other.occupied))
@@ -0,0 +1,134 @@
+"""
+Struct-of-arrays enemy patrol simulation
+
+Enemy patrol is just "move by speed * direction, turn around at the ends of
+the range". EnemySwarm keeps the patrol state of all of a level's enemies in
+NumPy arrays and steps every patrol in one batched operation. Positions are
+only written back to the sprites' rects (and their animations advanced) for
+enemies inside the view, so thousands of off-screen enemies cost almost
+nothing per frame.
+"""
+import numpy as np
+import pygame
+from config import *
+
+
+class EnemySwarm:
+    """Batched patrol simulation for a group of Enemy sprites
+
+    The arrays are the source of truth for enemy positions: rects of enemies
+    outside the view are stale until they come back into view. If an index
+    (a SpatialHash) is given, synced enemies are moved in it too.
+    """
+
+    def __init__(self, enemies=(), index=None):
+        self.sprites = []
+        self.index = index
+        self.x = np.zeros(0, dtype=np.int32)
+        self.y = np.zeros(0, dtype=np.int32)
+        self.width = np.zeros(0, dtype=np.int32)
+        self.height = np.zeros(0, dtype=np.int32)
+        self.direction = np.zeros(0, dtype=np.int32)
+        self.speed = np.zeros(0, dtype=np.int32)
+        self.start_x = np.zeros(0, dtype=np.int32)
+        self.movement_range = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.visible = np.zeros(0, dtype=bool)  # Synced by the last update (rects are up to date)
+        self.pending_ticks = 0  # Physics ticks of dt not simulated yet
+        self.add(*enemies)
+
+    def add(self, *enemies):
+        """Add enemies to the swarm, taking over their patrol state"""
+        if not enemies:
+            return
+
+        first = len(self.sprites)
+        for i, enemy in enumerate(enemies, first):
+            enemy.swarm = self
+            enemy.swarm_index = i
+        self.sprites.extend(enemies)
+
+        def column(values):
+            return np.array(values, dtype=np.int32)
+
+        self.x = np.concatenate([self.x, column([e.rect.x for e in enemies])])
+        self.y = np.concatenate([self.y, column([e.rect.y for e in enemies])])
+        self.width = np.concatenate([self.width, column([e.rect.width for e in enemies])])
+        self.height = np.concatenate([self.height, column([e.rect.height for e in enemies])])
+        self.direction = np.concatenate([self.direction, column([e.direction for e in enemies])])
+        self.speed = np.concatenate([self.speed, column([e.speed for e in enemies])])
+        self.start_x = np.concatenate([self.start_x, column([e.start_x for e in enemies])])
+        self.movement_range = np.concatenate([self.movement_range, column([e.movement_range for e in enemies])])
+        self.alive = np.concatenate([self.alive, np.ones(len(enemies), dtype=bool)])
+        self.visible = np.concatenate([self.visible, np.ones(len(enemies), dtype=bool)])
+
+    def remove(self, enemy):
+        """Stop simulating an enemy (called when it is killed)
+
+        Dead enemies keep their slot until more than half the slots are
+        dead, then the arrays are compacted.
+        """
+        if getattr(enemy, 'swarm', None) is self:
+            self.alive[enemy.swarm_index] = False
+            enemy.swarm = None
+            if np.count_nonzero(self.alive) * 2 < len(self.sprites):
+                self.compact()
+
+    def compact(self):
+        """Drop the slots of dead enemies from the arrays"""
+        keep = self.alive
+        for name in ('x', 'y', 'width', 'height', 'direction', 'speed', 'start_x', 'movement_range', 'visible'):
+            setattr(self, name, getattr(self, name)[keep])
+        self.sprites = [sprite for sprite, alive in zip(self.sprites, keep.tolist()) if alive]
+        self.alive = np.ones(len(self.sprites), dtype=bool)
+        for i, enemy in enumerate(self.sprites):
+            enemy.swarm_index = i
+
+    def update(self, dt=FRAME_TIME_MS, view=None, margin=ENEMY_WIDTH):
+        """Step every patrol by dt ms, then sync the enemies inside view (plus margin)
+
+        Patrols advance one physics tick at a time (each tick is one batched
+        step), so any dt gives the same paths as running at PHYSICS_RATE.
+        view defaults to the screen. Synced enemies get their rect and
+        direction written back and their animation advanced by dt ms.
+        """
+        if not self.sprites:
+            return
+
+        alive = self.alive
+        prev_x = self.x.copy()
+        self.pending_ticks += dt * PHYSICS_RATE / 1000
+        # Tolerate rounding so e.g. 3 ticks' worth of ms is 3 ticks
+        ticks = int(self.pending_ticks + 1e-6)
+        self.pending_ticks = max(self.pending_ticks - ticks, 0)
+        for _ in range(ticks):
+            self.x += np.where(alive, self.speed * self.direction, 0).astype(np.int32)
+
+            # Change direction when reaching the ends of the movement range
+            at_right = self.x >= self.start_x + self.movement_range
+            at_left = self.x <= self.start_x
+            self.direction[at_right] = -1
+            self.direction[at_left & ~at_right] = 1
+
+        if view is None:
+            view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        visible = (alive
+                   & (self.x + self.width > view.left - margin) & (self.x < view.right + margin)
+                   & (self.y + self.height > view.top - margin) & (self.y < view.bottom + margin))
+        self.visible = visible
+
+        sprites = self.sprites
+        index = self.index
+        for i in np.flatnonzero(visible).tolist():
+            enemy = sprites[i]
+            enemy.prev_x = int(prev_x[i])
+            enemy.rect.x = int(self.x[i])
+            enemy.direction = int(self.direction[i])
+            enemy.update_animation(dt)
+            if index is not None:
+                index.move(enemy)
+
+    def visible_sprites(self):
+        """Living enemies synced by the last update, the only ones worth drawing"""
+        sprites = self.sprites
+        return [sprites[i] for i in np.flatnonzero(self.visible & self.alive).tolist()]
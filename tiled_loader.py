@@ -1,120 +1,321 @@
 """
 Tiled map loader for loading TMX files
+
+Maps are read through their compiled level pack (see level_pack.py); the TMX
+file itself is only parsed when its pack is missing or out of date.
 """
+import os
+import numpy as np
 import pygame
-import pytmx
-from pytmx.util_pygame import load_pygame
-from entities import Platform, Enemy, Coin, Boss
+from assets import get_assets
+from spatial import TileGrid
+from level_pack import content_hash, read_pack, read_tmx, write_pack
 from config import *
 
 
+def is_collision_layer(layer):
+    """Whether a tile layer holds solid platforms"""
+    return 'platform' in layer['name'].lower() or 'collision' in layer['name'].lower()
+
+
+def is_hazard_layer(layer):
+    """Whether a tile layer holds hazards (spikes, etc) that damage the player"""
+    return 'hazard' in layer['name'].lower() or 'spike' in layer['name'].lower()
+
+
+def run_length(line):
+    """Number of leading True values in a 1D bool array"""
+    return int(line.argmin()) if not line.all() else len(line)
+
+
+def greedy_rectangles(occupied):
+    """Cover the True cells of a 2D bool array with few rectangles
+
+    Scanning in row-major order, each rectangle starts at the first cell not
+    covered yet, is as wide as the run of cells from there, and extends down
+    as long as the rows below are filled across that whole width. Returns
+    (column, row, columns, rows) tuples.
+    """
+    remaining = np.array(occupied, dtype=bool)
+    n_cols = remaining.shape[1]
+    flat = remaining.reshape(-1)
+    rects = []
+    start = 0
+    while start < flat.size:
+        # Everything before start is covered, so the next rectangle starts at the next filled cell
+        start += int(flat[start:].argmax())
+        if not flat[start]:
+            break
+        row, col = divmod(start, n_cols)
+        width = run_length(remaining[row, col:])
+        height = 1 + run_length(remaining[row + 1:, col:col + width].all(axis=1))
+        remaining[row:row + height, col:col + width] = False
+        rects.append((col, row, width, height))
+    return rects
+
+
 class TiledMapLoader:
     def __init__(self, tmx_file):
-        """Load a TMX file from Tiled"""
-        self.tmx_data = load_pygame(tmx_file)
-        self.width = self.tmx_data.width * self.tmx_data.tilewidth
-        self.height = self.tmx_data.height * self.tmx_data.tileheight
+        """Load a TMX file from Tiled, from its level pack if it is up to date"""
+        self.base_dir = os.path.dirname(tmx_file)
+        source_hash = content_hash(tmx_file)
+        self.level_map = read_pack(tmx_file, source_hash)
+        compile_pack = self.level_map is None
+        if compile_pack:
+            self.level_map = read_tmx(tmx_file)
+
+        self.cols = self.level_map['width']
+        self.rows = self.level_map['height']
+        self.tile_width = self.level_map['tilewidth']
+        self.tile_height = self.level_map['tileheight']
+        self.width = self.cols * self.tile_width
+        self.height = self.rows * self.tile_height
+
+        if compile_pack:
+            self.level_map['colliders'] = [rect for layer in self.level_map['layers'] if is_collision_layer(layer)
+                                           for rect in self.load_platforms_from_layer(layer)]
+            write_pack(tmx_file, self.level_map, source_hash)
+            print(f"Compiled level pack for {os.path.basename(tmx_file)}")
+
+        # Tile id -> Surface, and tileset path -> Surface, built on first use
+        self.tile_images = {}
+        self.tileset_images = {}
+        # Pre-rendered chunks of the background layers, as (chunk column,
+        # chunk row) -> (rect, surface), and their animated tiles as
+        # (x, y, frames), built by build_chunks()
+        self.chunks = None
+        self.chunk_size = (0, 0)
+        self.animated_tiles = []
 
     def load_level_data(self):
-        """Extract level data from the TMX file"""
-        platforms = []
-        enemies = pygame.sprite.Group()
-        coins = pygame.sprite.Group()
+        """Extract level data from the level map
+
+        Only plain data, no sprites or surfaces, so it can run on a worker
+        thread: enemies are (x, y, movement range) spawns, coins (x, y,
+        animation phase), the boss an (x, y) spawn or None.
+        """
+        platforms = [tuple(rect) for rect in self.level_map['colliders']]
+        enemies = []
+        coins = []
         boss = None
         player_spawn = None
 
-        # Load tile layers (platforms, background, etc)
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                # Check if this is a platform layer
-                if 'platform' in layer.name.lower() or 'collision' in layer.name.lower():
-                    platforms.extend(self.load_platforms_from_layer(layer))
+        # Collision and hazard tile layers
+        layers = self.level_map['layers']
+        solid_layers = [layer for layer in layers if is_collision_layer(layer)]
+        hazard_layers = [layer for layer in layers if is_hazard_layer(layer) and not is_collision_layer(layer)]
 
-        # Load object layers (enemies, coins, player spawn, boss)
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledObjectGroup):
-                for obj in layer:
-                    obj_type = obj.properties.get('type', '').lower()
+        # Load objects (enemies, coins, player spawn, boss)
+        for obj in self.level_map['objects']:
+            properties = obj['properties']
+            # Newer Tiled versions set the type as the object's class
+            obj_type = (properties.get('type') or obj['type'] or '').lower()
 
-                    if obj_type == 'player':
-                        player_spawn = (obj.x, obj.y)
+            if obj_type == 'player':
+                player_spawn = (obj['x'], obj['y'])
 
-                    elif obj_type == 'enemy':
-                        movement_range = obj.properties.get('movement_range', 100)
-                        enemy = Enemy(obj.x, obj.y, movement_range)
-                        enemies.add(enemy)
+            elif obj_type == 'enemy':
+                enemies.append((obj['x'], obj['y'], properties.get('movement_range', 100)))
 
-                    elif obj_type == 'coin':
-                        coin = Coin(obj.x, obj.y)
-                        coins.add(coin)
+            elif obj_type == 'coin':
+                coins.append((obj['x'], obj['y'], properties.get('animation_phase', 0)))
 
-                    elif obj_type == 'boss':
-                        boss = Boss(obj.x, obj.y)
+            elif obj_type == 'boss':
+                boss = (obj['x'], obj['y'])
 
         return {
             'platforms': platforms,
+            # Lined up with the Platform sprites and spawns, which are shifted
+            # by PLATFORM_HORIZONTAL_OFFSET; hazards match their drawn tiles
+            'collision': self.occupancy_grid(solid_layers, PLATFORM_HORIZONTAL_OFFSET),
+            'hazards': self.occupancy_grid(hazard_layers),
             'enemies': enemies,
             'coins': coins,
             'boss': boss,
             'player_spawn': player_spawn
         }
 
+    def occupancy_grid(self, layers, origin_x=0):
+        """TileGrid of the tiles filled in any of the layers, or None if there are no layers"""
+        if not layers:
+            return None
+        occupied = np.zeros((self.rows, self.cols), dtype=bool)
+        for layer in layers:
+            occupied |= layer['tiles'] != 0  # Tile id 0 is an empty tile
+        return TileGrid(occupied, self.tile_width, self.tile_height, origin_x)
+
     def load_platforms_from_layer(self, layer):
-        """Convert tile layer to platform objects"""
-        platforms = []
-
-        # Group consecutive tiles into platforms
-        for y in range(self.tmx_data.height):
-            platform_start = None
-            platform_width = 0
-
-            for x in range(self.tmx_data.width):
-                tile = self.tmx_data.get_tile_image(x, y, layer)
-
-                if tile:  # There's a tile here
-                    if platform_start is None:
-                        platform_start = x
-                    platform_width += 1
-                else:  # No tile, end of platform
-                    if platform_start is not None:
-                        # Create platform
-                        px = platform_start * self.tmx_data.tilewidth
-                        py = y * self.tmx_data.tileheight
-                        width = platform_width * self.tmx_data.tilewidth
-                        platform = Platform(px, py, width)
-                        platforms.append(platform)
-                        platform_start = None
-                        platform_width = 0
-
-            # Handle platform at end of row
-            if platform_start is not None:
-                px = platform_start * self.tmx_data.tilewidth
-                py = y * self.tmx_data.tileheight
-                width = platform_width * self.tmx_data.tilewidth
-                platform = Platform(px, py, width)
-                platforms.append(platform)
-
-        return platforms
-
-    def render_background_layers(self, surface):
-        """Render non-collision tile layers as background"""
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                # Skip platform/collision layers
-                if 'platform' in layer.name.lower() or 'collision' in layer.name.lower():
-                    continue
-
-                # Render background tiles
-                for x, y, image in layer.tiles():
-                    if image:
-                        surface.blit(image, (x * self.tmx_data.tilewidth, y * self.tmx_data.tileheight))
+        """Convert tile layer to platform rects (x, y, width, height)
+
+        Filled tiles are covered greedily with as few rectangles as possible.
+        The last row of each rectangle is PLATFORM_HEIGHT tall, like a single
+        row platform. The Level merges them into colliders and builds the
+        Platform sprites.
+        """
+        return [(col * self.tile_width, row * self.tile_height,
+                 cols * self.tile_width, (rows - 1) * self.tile_height + PLATFORM_HEIGHT)
+                for col, row, cols, rows in greedy_rectangles(layer['tiles'] != 0)]
+
+    def tile_image(self, gid):
+        """Surface of a tile id, cut from its tileset image (and flipped) on first use"""
+        image = self.tile_images.get(gid)
+        if image is None:
+            path, x, y, width, height, flip_x, flip_y, flip_diagonal = self.level_map['tiles'][gid]
+            tileset = self.tileset_images.get(path)
+            if tileset is None:
+                tileset = pygame.image.load(os.path.join(self.base_dir, path)).convert_alpha()
+                self.tileset_images[path] = tileset
+
+            image = tileset if width is None else tileset.subsurface((x, y, width, height))
+            if flip_diagonal:
+                image = pygame.transform.flip(pygame.transform.rotate(image, 270), True, False)
+            if flip_x or flip_y:
+                image = pygame.transform.flip(image, flip_x, flip_y)
+            self.tile_images[gid] = image
+        return image
+
+    def background_layers(self):
+        """Tile id arrays of the non-collision tile layers, in map order"""
+        return [layer['tiles'] for layer in self.level_map['layers'] if not is_collision_layer(layer)]
+
+    def build_chunks(self, chunk_size=TILE_CHUNK_SIZE):
+        """Pre-render the non-collision tile layers into chunk_size square chunks
+
+        Layers are composited into each chunk in map order. Chunks with
+        nothing visible are dropped. Animated tiles are left out of the chunks
+        and collected for draw_animated_tiles() instead, so chunks never need
+        re-rendering.
+        """
+        # Chunks are aligned to whole tiles
+        chunk_cols = max(chunk_size // self.tile_width, 1)
+        chunk_rows = max(chunk_size // self.tile_height, 1)
+        self.chunk_size = (chunk_cols * self.tile_width, chunk_rows * self.tile_height)
+        self.chunks = {}
+        self.find_animated_tiles()
+        for chunk_row in range(-(-self.rows // chunk_rows)):
+            for chunk_col in range(-(-self.cols // chunk_cols)):
+                self.render_chunk(chunk_col, chunk_row)
+
+    def find_animated_tiles(self):
+        """Collect the animated tiles of the non-collision layers for draw_animated_tiles()"""
+        animations = self.level_map['animations']
+        self.animated_tiles = []
+        for layer in self.background_layers():
+            for row, col in np.argwhere(np.isin(layer, list(animations))).tolist():
+                frames = [(self.tile_image(gid), duration) for gid, duration in animations[int(layer[row, col])]]
+                self.animated_tiles.append((col * self.tile_width, row * self.tile_height, frames))
+
+    def render_chunk(self, chunk_col, chunk_row):
+        """Pre-render one chunk (sized by build_chunks) into self.chunks, or drop it if nothing in it is visible"""
+        layers = self.background_layers()
+        animations = self.level_map['animations']
+        chunk_cols = self.chunk_size[0] // self.tile_width
+        chunk_rows = self.chunk_size[1] // self.tile_height
+        left, top = chunk_col * chunk_cols, chunk_row * chunk_rows
+        window = (slice(top, top + chunk_rows), slice(left, left + chunk_cols))
+        self.chunks.pop((chunk_col, chunk_row), None)
+        if not any(layer[window].any() for layer in layers):
+            return
+
+        rect = pygame.Rect((left * self.tile_width, top * self.tile_height), self.chunk_size)
+        surface = pygame.Surface(rect.size, pygame.SRCALPHA).convert_alpha()
+        surface.fill((0, 0, 0, 0))
+        for layer in layers:
+            block = layer[window]
+            for row, col in np.argwhere(block).tolist():
+                gid = int(block[row, col])
+                if gid not in animations:
+                    surface.blit(self.tile_image(gid), (col * self.tile_width, row * self.tile_height))
+
+        # Only animated (or fully transparent) tiles
+        if not surface.get_bounding_rect().width:
+            return
+        self.chunks[(chunk_col, chunk_row)] = (rect, surface)
+        assets = get_assets()
+        if assets:
+            assets.track_surface(surface, 'tile_chunks', 'Level')
+
+    def adopt_chunks(self, old):
+        """Take over the chunks of an earlier version of this map, re-rendering only the changed ones
+
+        Chunks are re-rendered where any background tile differs. If the
+        map size, its tiles or its background layers changed shape, nothing is
+        reused and the chunks are all rebuilt on first use. Returns the
+        number of chunks re-rendered, or None if none were reused.
+        """
+        old_layers = old.background_layers()
+        layers = self.background_layers()
+        compatible = (old.chunks is not None and
+                      (old.cols, old.rows, old.tile_width, old.tile_height) ==
+                      (self.cols, self.rows, self.tile_width, self.tile_height) and
+                      len(old_layers) == len(layers) and
+                      old.level_map['tiles'] == self.level_map['tiles'] and
+                      old.level_map['animations'] == self.level_map['animations'])
+        if not compatible:
+            return None
+
+        # Same tiles, so the cut (and flipped) tile images can be reused too
+        self.tile_images = old.tile_images
+        self.tileset_images = old.tileset_images
+        self.chunk_size = old.chunk_size
+        self.chunks = dict(old.chunks)
+        self.find_animated_tiles()
+
+        changed = np.zeros((self.rows, self.cols), dtype=bool)
+        for layer, old_layer in zip(layers, old_layers):
+            changed |= layer != old_layer
+        chunk_cols = self.chunk_size[0] // self.tile_width
+        chunk_rows = self.chunk_size[1] // self.tile_height
+        dirty = {(col // chunk_cols, row // chunk_rows) for row, col in np.argwhere(changed).tolist()}
+        for chunk_col, chunk_row in dirty:
+            self.render_chunk(chunk_col, chunk_row)
+        return len(dirty)
+
+    def render_background_layers(self, surface, view=None):
+        """Render non-collision tile layers as background
+
+        Blits the pre-rendered chunks overlapping view (the map area shown on
+        surface, by default the one at the map's origin). Only the chunks
+        under view are looked up, however big the map is.
+        """
+        if self.chunks is None:
+            self.build_chunks()
+        if view is None:
+            view = surface.get_rect()
+        width, height = self.chunk_size
+        chunks = self.chunks
+        blits = []
+        for chunk_row in range(max(view.top // height, 0), (view.bottom - 1) // height + 1):
+            for chunk_col in range(max(view.left // width, 0), (view.right - 1) // width + 1):
+                chunk = chunks.get((chunk_col, chunk_row))
+                if chunk:
+                    rect, image = chunk
+                    blits.append((image, (rect.x - view.x, rect.y - view.y)))
+        surface.blits(blits, doreturn=False)
+
+    def draw_animated_tiles(self, surface, time_ms, view=None):
+        """Draw the current frame of each animated tile overlapping view, time_ms into the level"""
+        if view is None:
+            view = surface.get_rect()
+        for x, y, frames in self.animated_tiles:
+            if not view.colliderect((x, y, self.tile_width, self.tile_height)):
+                continue
+            elapsed = time_ms % sum(duration for _, duration in frames)
+            for image, duration in frames:
+                if elapsed < duration:
+                    break
+                elapsed -= duration
+            surface.blit(image, (x - view.x, y - view.y))
+
+
+def level_tmx_file(level_number):
+    """Path of a level's TMX file (which may not exist)"""
+    return os.path.join(os.path.dirname(__file__), 'assets', 'levels', f'level{level_number}.tmx')
 
 
 def load_level_from_tiled(level_number):
     """Load a level from a Tiled TMX file"""
-    import os
-
-    tmx_file = os.path.join(os.path.dirname(__file__), 'assets', 'levels', f'level{level_number}.tmx')
+    tmx_file = level_tmx_file(level_number)
 
     if not os.path.exists(tmx_file):
         return None
@@ -125,5 +326,6 @@ def load_level_from_tiled(level_number):
         level_data['loader'] = loader  # Keep loader for background rendering
         return level_data
     except Exception as e:
-        print(f"Error loading Tiled map: {e}")
-        return None
\ No newline at end of file
+        print(f"Error loading Tiled map {tmx_file}: {e}")
+        print(f"Falling back to the hardcoded layout of level {level_number}")
+        return None